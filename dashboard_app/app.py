@@ -1,3 +1,5 @@
+import importlib.util
+import threading
 import warnings
 import os
 
@@ -10,7 +12,10 @@ from dash.dependencies import Input, Output, State
 import dash_bootstrap_components as dbc
 
 # import pages
-from data_loader import load_integrated_dataset
+from dashboard_app.compression import enable_compression
+from dashboard_app.dataset import DatasetHolder
+from dashboard_app.figure_cache import FigureCache
+from dashboard_app.figure_store import DiskFigureStore
 from dashboard_app.pages.home_page import create_home_page
 from dashboard_app.pages.about_page import create_about_page
 from dashboard_app.pages.dashboard_page import create_dashboard_page
@@ -27,6 +32,7 @@ from dashboard_app.callbacks.emissions_nox_callback import emissions_nox_callbac
 from dashboard_app.callbacks.electricity_boxplot_callback import electricity_callback
 from dashboard_app.callbacks.fuels_boxplot_callback import other_fuels_callback
 from dashboard_app.callbacks.natural_gas_boxplot_callback import natural_gas_callback
+from dashboard_app.callbacks.filter_options_callback import filter_options_callback
 from dashboard_app.callbacks.download_buttons_callback import download_csv
 from dashboard_app.callbacks.download_buttons_callback import download_excel
 from dashboard_app.callbacks.techdoc_callback import download_td_pdf
@@ -59,133 +65,42 @@ def create_app():
         serve_locally=True,
     )
 
-    # load data
-    integrated_df = load_integrated_dataset()
-
-    filters_df = integrated_df[
-        [
-            "fy",
-            "naics_description",
-            "naics_imputed",
-            "state",
-            "arc2",
-            "specific_description",
-            "impstatus",
-            "reference_year",
-            "main_code",
-            "main_description",
-            "sub_code",
-            "sub_description",
-        ]
-    ].drop_duplicates()
-    boxplot_cost_df = integrated_df[
-        [
-            "fy",
-            "naics_description",
-            "naics_imputed",
-            "state",
-            "arc2",
-            "specific_description",
-            "impstatus",
-            "impcost_adj",
-        ]
-    ].drop_duplicates()
-    boxplot_payback_df = integrated_df[
-        [
-            "fy",
-            "naics_description",
-            "naics_imputed",
-            "state",
-            "arc2",
-            "specific_description",
-            "impstatus",
-            "payback_imputed",
-        ]
-    ].drop_duplicates()
-    boxplot_co2_df = integrated_df[integrated_df["emission_type"] == "CO2"][
-        [
-            "fy",
-            "naics_description",
-            "naics_imputed",
-            "state",
-            "arc2",
-            "specific_description",
-            "impstatus",
-            "emissions_avoided",
-        ]
-    ].drop_duplicates()
-    boxplot_nox_df = integrated_df[integrated_df["emission_type"] == "NOx"][
-        [
-            "fy",
-            "naics_description",
-            "naics_imputed",
-            "state",
-            "arc2",
-            "specific_description",
-            "impstatus",
-            "emissions_avoided",
-        ]
-    ].drop_duplicates()
-    boxplot_so2_df = integrated_df[integrated_df["emission_type"] == "SO2"][
-        [
-            "fy",
-            "naics_description",
-            "naics_imputed",
-            "state",
-            "arc2",
-            "specific_description",
-            "impstatus",
-            "emissions_avoided",
-        ]
-    ].drop_duplicates()
-    boxplot_electricity_df = integrated_df[integrated_df["sourccode"].isin(["EC"])][
-        [
-            "fy",
-            "naics_description",
-            "naics_imputed",
-            "state",
-            "arc2",
-            "specific_description",
-            "impstatus",
-            "conserved",
-        ]
-    ].drop_duplicates()
-    boxplot_natural_gas_df = integrated_df[integrated_df["sourccode"].isin(["E2"])][
-        [
-            "fy",
-            "naics_description",
-            "naics_imputed",
-            "state",
-            "arc2",
-            "specific_description",
-            "impstatus",
-            "conserved",
-        ]
-    ].drop_duplicates()
-    boxplot_fuels_df = integrated_df[
-        ~integrated_df["sourccode"].isin(["EC", "ED", "EF"])
-    ][
-        [
-            "fy",
-            "naics_description",
-            "naics_imputed",
-            "state",
-            "arc2",
-            "specific_description",
-            "impstatus",
-            "conserved",
-        ]
-    ].drop_duplicates()
+    # gzip/brotli callback, layout and bundle responses, and serve the assets
+    # from their precompressed variants (see compression.precompress_assets)
+    enable_compression(app)
+
+    # Dash encodes callback responses with plotly's JSON engine, which uses
+    # orjson when it is installed: the float32 chart values are then written
+    # at float32 precision (e.g. 151.0575 instead of 151.0574951171875) and
+    # encoded several times faster
+    if importlib.util.find_spec("orjson") is None:
+        print("orjson is not installed; chart data is sent as float64 JSON text")
+
+    # load data (see DATA_LOAD_MODE in data_loader.load_serving_bundle) and
+    # watch data/final/ for new pipeline output (see DATA_RELOAD_INTERVAL)
+    dataset_holder = DatasetHolder()
+    dataset_holder.start()
+
+    # cache of recently built chart figures (see FIGURE_CACHE_MAX_ENTRIES and
+    # FIGURE_CACHE_MAX_MB), backed by a store shared by all workers on the node
+    # (see FIGURE_CACHE_PATH and FIGURE_CACHE_DISK_MB); hit/miss counters are
+    # served at /figure-cache-stats
+    figure_cache = FigureCache(disk_store=DiskFigureStore())
+
+    @app.server.route("/figure-cache-stats")
+    def figure_cache_stats():
+        return figure_cache.stats()
 
     # initialize callbacks
-    cost_boxplot_callback(app, boxplot_cost_df)
-    payback_boxplot_callback(app, boxplot_payback_df)
-    emissions_co2_callback(app, boxplot_co2_df)
-    emissions_so2_callback(app, boxplot_so2_df)
-    emissions_nox_callback(app, boxplot_nox_df)
-    electricity_callback(app, boxplot_electricity_df)
-    natural_gas_callback(app, boxplot_natural_gas_df)
-    other_fuels_callback(app, boxplot_fuels_df)
+    cost_boxplot_callback(app, dataset_holder, figure_cache)
+    payback_boxplot_callback(app, dataset_holder, figure_cache)
+    emissions_co2_callback(app, dataset_holder, figure_cache)
+    emissions_so2_callback(app, dataset_holder, figure_cache)
+    emissions_nox_callback(app, dataset_holder, figure_cache)
+    electricity_callback(app, dataset_holder, figure_cache)
+    natural_gas_callback(app, dataset_holder, figure_cache)
+    other_fuels_callback(app, dataset_holder, figure_cache)
+    filter_options_callback(app, dataset_holder)
     download_excel(app, get_data_from_local)
     download_csv(app, get_data_from_local)
     download_td_pdf(app, get_td_from_local)
@@ -198,28 +113,36 @@ def create_app():
         [dcc.Location(id="url", refresh=False), html.Div(id="page-content")]
     )
 
+    # the page trees are built once and reused by every navigation: the
+    # static pages for the lifetime of the app, the dashboard page (filter
+    # options and update date) once per dataset version
+    static_pages = {
+        "/about": create_about_page(),
+        "/documentation": create_docs_page(),
+        "/data": create_data_page(),
+        "/contact": create_contact_page(),
+    }
+    dashboard_pages = {}
+    dashboard_pages_lock = threading.Lock()
+
+    def get_dashboard_page(dataset):
+        with dashboard_pages_lock:
+            page = dashboard_pages.get(dataset.version)
+            if page is None:
+                page = create_dashboard_page(
+                    dataset.filter_options, reference_year=dataset.reference_year
+                )
+                # pages of older versions are no longer served
+                dashboard_pages.clear()
+                dashboard_pages[dataset.version] = page
+            return page
+
     @app.callback(Output("page-content", "children"), Input("url", "pathname"))
     def display_page(pathname):
-        if pathname == "/home":
-            return create_dashboard_page(
-                filters_df, reference_year=integrated_df["reference_year"].max()
-            )
-        if pathname == "/dashboard":
-            return create_dashboard_page(
-                filters_df, reference_year=integrated_df["reference_year"].max()
-            )
-        elif pathname == "/about":
-            return create_about_page()
-        elif pathname == "/documentation":
-            return create_docs_page()
-        elif pathname == "/data":
-            return create_data_page()
-        elif pathname == "/contact":
-            return create_contact_page()
-        else:
-            return create_dashboard_page(
-                filters_df, reference_year=integrated_df["reference_year"].max()
-            )
+        if pathname in static_pages:
+            return static_pages[pathname]
+        # /home, /dashboard and unknown paths show the dashboard
+        return get_dashboard_page(dataset_holder.current)
 
     # navbar toggle callback
     @app.callback(
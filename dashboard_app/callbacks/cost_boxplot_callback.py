@@ -1,11 +1,12 @@
 from dash import Input, Output
 from charts.boxplot_cost import create_boxplot_cost_chart
-from helpers.filter_outliers import filter_outliers
-from helpers.apply_wildcard_filter import apply_wildcard_filter
+from helpers.gather_rows import gather_rows
+from helpers.get_filter_state import get_filter_state
+from dashboard_app.charts.box_statistics import get_boxplot_mode
 import pandas as pd
 
 
-def cost_boxplot_callback(app, boxplot_cost_df):
+def cost_boxplot_callback(app, dataset_holder, figure_cache):
     @app.callback(
         Output("cost-boxplot", "figure"),
         Input("sector-filter", "value"),
@@ -18,32 +19,65 @@ def cost_boxplot_callback(app, boxplot_cost_df):
     def update_outputs(
         naics_imputed, fy_range, impstatus, arc2, state, remove_outliers
     ):
-        # Start with full dataset
-        dff = boxplot_cost_df.copy()
+        # Read the data version current when the request arrived
+        dataset = dataset_holder.current
 
-        # Apply NAICS filter with wildcard support
-        if naics_imputed:
-            dff = apply_wildcard_filter(dff, naics_imputed, "naics_imputed")
+        # Serve repeated filter combinations from the figure cache; the
+        # outlier threshold is rounded to the slider step so that equal
+        # positions share an entry
+        remove_outliers = round(remove_outliers or 0, 1)
+        filter_state = get_filter_state(
+            naics_imputed, fy_range, impstatus, arc2, state
+        )
+        figure_key = ("cost", dataset.version, filter_state, remove_outliers)
+        figure = figure_cache.get(figure_key)
+        if figure is not None:
+            return figure
 
-        # Apply year range filter
-        if fy_range:  # Handling range slider correctly
-            min_year, max_year = fy_range  # Unpack the range values
-            dff = dff[(dff["fy"] >= min_year) & (dff["fy"] <= max_year)]
+        boxplot_mode = get_boxplot_mode()
+        if boxplot_mode == "sketch":
+            # Merge the precomputed sketches of the matching cells, with the
+            # outlier removal applied to the merged sketches
+            dff = dataset.sketch_box_statistics(
+                "cost",
+                naics_imputed,
+                fy_range,
+                impstatus,
+                arc2,
+                state,
+                "impcost_adj",
+                remove_outliers,
+            )
+        else:
+            # Look up the rows matching the NAICS (with wildcard support), year
+            # range, implementation status, ARC (with wildcard support) and state
+            # filters; the filters are evaluated once and shared by all boxplots
+            if remove_outliers:
+                # Apply outlier removal (see Dataset.select_rows_without_outliers)
+                rows = dataset.select_rows_without_outliers(
+                    "cost",
+                    naics_imputed,
+                    fy_range,
+                    impstatus,
+                    arc2,
+                    state,
+                    "impcost_adj",
+                    remove_outliers,
+                )
+            else:
+                rows = dataset.select_rows(
+                    "cost", naics_imputed, fy_range, impstatus, arc2, state
+                )
+            frame = dataset.frames["cost"]
 
-        # Apply implementation status filter
-        if impstatus:
-            dff = dff[dff["impstatus"].isin(impstatus)]
+            # Keep the points to draw: a fixed, stratified sample of the rows
+            # instead of a fresh random draw on every request
+            if boxplot_mode == "points":
+                rows = dataset.sample_rows("cost", rows)
 
-        # Apply ARC filter with wildcard support
-        if arc2:
-            dff = apply_wildcard_filter(dff, arc2, "arc2")
+            # Gather only the columns the chart plots
+            dff = gather_rows(frame, rows, ["arc2", "impstatus", "impcost_adj"])
 
-        # Apply state filter
-        if state:
-            dff = dff[dff["state"].isin(state)]
-
-        # Apply outlier removal
-        if remove_outliers:
-            dff = filter_outliers(dff, "impcost_adj", std_threshold=remove_outliers)
-
-        return create_boxplot_cost_chart(dff)
+        figure = create_boxplot_cost_chart(dff)
+        figure_cache.put(figure_key, figure)
+        return figure
@@ -0,0 +1,52 @@
+from dash import Input, Output
+from helpers.get_counted_options import get_counted_options
+
+# filter column of each dropdown and the keys of its options in filter_options
+# (see helpers.get_filter_options)
+COUNTED_DROPDOWNS = {
+    "sector-filter": ("naics_imputed", ["naics_wildcards", "naics_options"]),
+    "arc-filter": ("arc2", ["arc_wildcards", "arc_options"]),
+    "state-filter": ("state", ["state_options"]),
+}
+
+
+def filter_options_callback(app, dataset_holder):
+    @app.callback(
+        Output("sector-filter", "options"),
+        Output("arc-filter", "options"),
+        Output("state-filter", "options"),
+        Input("sector-filter", "value"),
+        Input("fy-filter", "value"),
+        Input("impstatus-filter", "value"),
+        Input("arc-filter", "value"),
+        Input("state-filter", "value"),
+    )
+    def update_options(naics_imputed, fy_range, impstatus, arc2, state):
+        # Cascade the filters: every sector, ARC and state option shows the
+        # recommendations it would select under the other filters, and
+        # options that would select none are disabled. The counts are summed
+        # from the filter cells, so no rows are read.
+        dataset = dataset_holder.current
+        filters = [naics_imputed, fy_range, impstatus, arc2, state]
+        selections = {
+            "sector-filter": naics_imputed,
+            "arc-filter": arc2,
+            "state-filter": state,
+        }
+
+        dropdown_options = []
+        for dropdown_id, (column, option_keys) in COUNTED_DROPDOWNS.items():
+            options = [
+                option
+                for key in option_keys
+                for option in dataset.filter_options[key]
+            ]
+            counts = dataset.count_filter_values(
+                column, [option["value"] for option in options], *filters
+            )
+            dropdown_options.append(
+                get_counted_options(options, counts, selections[dropdown_id])
+            )
+        return tuple(dropdown_options)
+
+    return update_options
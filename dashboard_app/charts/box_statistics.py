@@ -0,0 +1,114 @@
+import os
+
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+from dashboard_app.helpers.get_box_statistics import get_box_statistics
+
+# "points" sends the (sampled) raw values of every box to the browser, which
+# computes the statistics and draws all points; "statistics" computes the
+# boxes on the server from all rows and sends only the outliers; "sketch"
+# approximates the boxes from quantile sketches precomputed per filter cell
+# (see quantile_sketch.CellSketches)
+DEFAULT_BOXPLOT_MODE = "points"
+
+# most outlier points sent per chart, like the sample size of the points mode
+MAX_OUTLIER_POINTS = 10000
+
+
+def get_boxplot_mode():
+    mode = os.getenv("BOXPLOT_MODE", DEFAULT_BOXPLOT_MODE).lower()
+    if mode not in ("points", "statistics", "sketch"):
+        raise ValueError(f"Unknown BOXPLOT_MODE: {mode}")
+    return mode
+
+
+def to_json_floats(values):
+    """
+    Convert an array to a list of Python floats with the shortest decimal
+    form of their own dtype. Nested lists are not serialized as typed arrays,
+    so float32 values would otherwise be written with float64 precision
+    (e.g. 5.099999904632568 instead of 5.1).
+    """
+    return values.astype(str).astype(np.float64).tolist()
+
+
+def sample_outliers(outliers, max_points=MAX_OUTLIER_POINTS):
+    """
+    Reduce the outlier points of all boxes to at most max_points, drawn at
+    random (but reproducibly) across the boxes.
+    """
+    counts = [len(points) for points in outliers]
+    if sum(counts) <= max_points:
+        return outliers
+    rng = np.random.default_rng(42)
+    keep = np.zeros(sum(counts), dtype=bool)
+    keep[rng.choice(len(keep), size=max_points, replace=False)] = True
+    bounds = np.cumsum([0] + counts)
+    return [
+        points[keep[bounds[i] : bounds[i + 1]]] for i, points in enumerate(outliers)
+    ]
+
+
+def create_box_statistics_chart(
+    df, x, y, color, labels, category_orders, template="plotly_white"
+):
+    """
+    Grouped boxplot with statistics computed on the server.
+
+    Takes the same arguments as the px.box calls of the chart modules and
+    produces the same traces and layout, except that every box carries its
+    precomputed quartiles and whiskers and only the points beyond the
+    whiskers instead of all raw values.
+
+    In the sketch mode, df already holds the box statistics merged from the
+    sketches by the callback.
+    """
+    if get_boxplot_mode() == "sketch":
+        statistics = df.copy()
+    else:
+        statistics = get_box_statistics(df, y, [color, x])
+    statistics["outliers"] = sample_outliers(statistics["outliers"].tolist())
+    colorway = pio.templates[template].layout.colorway
+
+    # one trace per colour group, in category order as in px.box
+    groups = list(category_orders[color])
+    groups += [g for g in statistics[color].unique() if g not in groups]
+    traces = []
+    for group in groups:
+        boxes = statistics[statistics[color] == group]
+        if boxes.empty:
+            continue
+        # plain dicts are validated once, by go.Figure, instead of twice
+        traces.append(
+            dict(
+                type="box",
+                name=str(group),
+                legendgroup=str(group),
+                offsetgroup=str(group),
+                alignmentgroup="True",
+                x=boxes[x].astype(str).to_numpy(),
+                q1=boxes["q1"].to_numpy(),
+                median=boxes["median"].to_numpy(),
+                q3=boxes["q3"].to_numpy(),
+                lowerfence=boxes["lowerfence"].to_numpy(),
+                upperfence=boxes["upperfence"].to_numpy(),
+                # per-box samples; only the outliers are sent
+                y=[to_json_floats(outliers) for outliers in boxes["outliers"]],
+                boxpoints="outliers",
+                marker=dict(color=colorway[len(traces) % len(colorway)]),
+                orientation="v",
+                showlegend=True,
+            )
+        )
+
+    fig = go.Figure(data=traces)
+    fig.update_layout(
+        template=template,
+        boxmode="group",
+        xaxis_title_text=labels.get(x, x),
+        yaxis_title_text=labels.get(y, y),
+        legend=dict(title_text=labels.get(color, color), tracegroupgap=0),
+        margin=dict(t=60),
+    )
+    return fig
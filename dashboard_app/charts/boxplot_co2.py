@@ -15,12 +15,20 @@ import plotly.graph_objects as go
 import traceback
 import pandas as pd
 import plotly.io as pio
+from dashboard_app.charts.box_statistics import (
+    create_box_statistics_chart,
+    get_boxplot_mode,
+)
+from dashboard_app.charts.webgl_points import (
+    create_webgl_points_chart,
+    use_webgl_points,
+)
 
 
 def create_boxplot_co2_chart(boxplot_co2_df):
-    # sample the data if it's too large
-    if len(boxplot_co2_df) > 10000:
-        boxplot_co2_df = boxplot_co2_df.sample(n=10000, random_state=42)
+    # the callbacks sample the rows of points mode (see row_sampler.RowSampler);
+    # server-side box statistics use all rows
+    boxplot_mode = get_boxplot_mode()
 
     # define status labels mapping
     status_labels = {
@@ -30,25 +38,55 @@ def create_boxplot_co2_chart(boxplot_co2_df):
         "K": "Unknown",
     }
 
+    # axis and legend titles and the order of the status groups, the same in
+    # every boxplot mode
+    labels = {
+        "arc2": "Recommendation Type",
+        "emissions_avoided": "CO2 Emissions Avoided (kg per year)",
+        "impstatus": "Status",
+    }
+    category_orders = {"impstatus": ["I", "N", "P", "K"]}
+
     # check if dataframe is empty after filtering
     if boxplot_co2_df.empty:
         return px.scatter(title="No data available for the selected filters")
 
-    fig = px.box(
-        boxplot_co2_df,
-        x="arc2",
-        y="emissions_avoided",
-        color="impstatus",
-        boxmode="group",
-        points="all",
-        labels={
-            "arc2": "Recommendation Type",
-            "emissions_avoided": "CO2 Emissions Avoided (kg per year)",
-            "impstatus": "Status",
-        },
-        category_orders={"impstatus": ["I", "N", "P", "K"]},
-        template="plotly_white",
-    )
+    if boxplot_mode != "points":
+        fig = create_box_statistics_chart(
+            boxplot_co2_df,
+            x="arc2",
+            y="emissions_avoided",
+            color="impstatus",
+            labels=labels,
+            category_orders=category_orders,
+            template="plotly_white",
+        )
+    elif use_webgl_points(len(boxplot_co2_df)):
+        # draw many points in WebGL rather than one SVG marker each
+        fig = create_webgl_points_chart(
+            boxplot_co2_df,
+            x="arc2",
+            y="emissions_avoided",
+            color="impstatus",
+            labels=labels,
+            category_orders=category_orders,
+            template="plotly_white",
+        )
+    else:
+        # plotly express expects plain labels for the colour column, not categoricals
+        boxplot_co2_df = boxplot_co2_df.astype({"impstatus": str})
+
+        fig = px.box(
+            boxplot_co2_df,
+            x="arc2",
+            y="emissions_avoided",
+            color="impstatus",
+            boxmode="group",
+            points="all",
+            labels=labels,
+            category_orders=category_orders,
+            template="plotly_white",
+        )
 
     fig.update_traces(
         marker=dict(size=5),  # boxplot point size
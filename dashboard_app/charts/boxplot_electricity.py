@@ -3,12 +3,20 @@ import plotly.express as px
 # import plotly.graph_objects as go
 import traceback
 import pandas as pd
+from dashboard_app.charts.box_statistics import (
+    create_box_statistics_chart,
+    get_boxplot_mode,
+)
+from dashboard_app.charts.webgl_points import (
+    create_webgl_points_chart,
+    use_webgl_points,
+)
 
 
 def create_boxplot_electricity_chart(boxplot_electricity_df):
-    # sample the data if it's too large
-    if len(boxplot_electricity_df) > 10000:
-        boxplot_electricity_df = boxplot_electricity_df.sample(n=10000, random_state=42)
+    # the callbacks sample the rows of points mode (see row_sampler.RowSampler);
+    # server-side box statistics use all rows
+    boxplot_mode = get_boxplot_mode()
 
     # define status labels mapping
     status_labels = {
@@ -18,25 +26,55 @@ def create_boxplot_electricity_chart(boxplot_electricity_df):
         "K": "Unknown",
     }
 
+    # axis and legend titles and the order of the status groups, the same in
+    # every boxplot mode
+    labels = {
+        "arc2": "Recommendation Type",
+        "conserved": "Electricity saved (kWh per year)",
+        "impstatus": "Status",
+    }
+    category_orders = {"impstatus": ["I", "N", "P", "K"]}
+
     # check if dataframe is empty after filtering
     if boxplot_electricity_df.empty:
         return px.scatter(title="No data available for the selected filters")
 
-    fig = px.box(
-        boxplot_electricity_df,
-        x="arc2",
-        y="conserved",
-        color="impstatus",
-        boxmode="group",
-        points="all",
-        labels={
-            "arc2": "Recommendation Type",
-            "conserved": "Electricity saved (kWh per year)",
-            "impstatus": "Status",
-        },
-        category_orders={"impstatus": ["I", "N", "P", "K"]},
-        template="plotly_white",
-    )
+    if boxplot_mode != "points":
+        fig = create_box_statistics_chart(
+            boxplot_electricity_df,
+            x="arc2",
+            y="conserved",
+            color="impstatus",
+            labels=labels,
+            category_orders=category_orders,
+            template="plotly_white",
+        )
+    elif use_webgl_points(len(boxplot_electricity_df)):
+        # draw many points in WebGL rather than one SVG marker each
+        fig = create_webgl_points_chart(
+            boxplot_electricity_df,
+            x="arc2",
+            y="conserved",
+            color="impstatus",
+            labels=labels,
+            category_orders=category_orders,
+            template="plotly_white",
+        )
+    else:
+        # plotly express expects plain labels for the colour column, not categoricals
+        boxplot_electricity_df = boxplot_electricity_df.astype({"impstatus": str})
+
+        fig = px.box(
+            boxplot_electricity_df,
+            x="arc2",
+            y="conserved",
+            color="impstatus",
+            boxmode="group",
+            points="all",
+            labels=labels,
+            category_orders=category_orders,
+            template="plotly_white",
+        )
 
     fig.update_traces(
         marker=dict(size=5),  # boxplot point size
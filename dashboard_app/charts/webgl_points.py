@@ -0,0 +1,146 @@
+import os
+
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+from dashboard_app.helpers.get_box_statistics import get_box_statistics
+
+# points mode charts with more points than this draw them with WebGL
+DEFAULT_WEBGL_POINTS_THRESHOLD = 2000
+
+# placement of the points next to their box, as px.box draws them with
+# points="all": centred at POINT_POSITION box half-widths from the box centre
+# and spread over JITTER half-widths
+POINT_POSITION = -1.5
+JITTER = 0.3
+
+
+def get_webgl_points_threshold():
+    return int(os.getenv("WEBGL_POINTS_THRESHOLD", DEFAULT_WEBGL_POINTS_THRESHOLD))
+
+
+def use_webgl_points(n_points):
+    """Whether a points mode chart of n_points is drawn with WebGL (0: never)."""
+    threshold = get_webgl_points_threshold()
+    return threshold > 0 and n_points > threshold
+
+
+def create_webgl_points_chart(
+    df,
+    x,
+    y,
+    color,
+    labels,
+    category_orders,
+    template="plotly_white",
+    boxgap=0.5,
+    boxgroupgap=0.6,
+):
+    """
+    Grouped boxplot of all points with the points drawn in WebGL.
+
+    Takes the same arguments as the px.box calls of the chart modules. The
+    boxes are box traces with statistics computed on the server from the
+    points, and the points themselves one Scattergl trace per colour group,
+    jittered next to their box like px.box with points="all". The browser
+    then draws the points on a single canvas instead of one SVG element per
+    point.
+
+    Scattergl traces cannot be placed on a category axis by box group, so the
+    x axis is numeric with the categories as tick labels, and every box is
+    positioned explicitly where boxmode="group" would put it for the given
+    boxgap and boxgroupgap (those of the chart modules' layout).
+    """
+    colorway = pio.templates[template].layout.colorway
+    statistics = get_box_statistics(df, y, [color, x])
+    categories = df[x].dropna().astype(str).unique()
+    category_positions = {category: i for i, category in enumerate(categories)}
+
+    # one box and one point trace per colour group, in category order as in
+    # px.box
+    groups = list(category_orders[color])
+    groups += [g for g in statistics[color].unique() if g not in groups]
+    groups = [g for g in groups if (statistics[color] == g).any()]
+    if not groups:
+        # every value is missing: nothing to place on the axis
+        return go.Figure(
+            layout=dict(
+                template=template,
+                title_text="No data available for the selected filters",
+            )
+        )
+
+    # box placement of plotly.js for boxmode="group" on a category axis
+    half_width = 0.5 * (1 - boxgap) * (1 - boxgroupgap) / len(groups)
+    rng = np.random.default_rng(42)
+
+    traces = []
+    for i, group in enumerate(groups):
+        trace_color = colorway[i % len(colorway)]
+        offset = ((i + 0.5) / len(groups) - 0.5) * (1 - boxgap)
+        boxes = statistics[statistics[color] == group]
+        box_positions = (boxes[x].astype(str).map(category_positions) + offset).round(3)
+        # plain dicts are validated once, by go.Figure, instead of twice
+        traces.append(
+            dict(
+                type="box",
+                name=str(group),
+                legendgroup=str(group),
+                x=box_positions.to_numpy(),
+                width=2 * half_width,
+                q1=boxes["q1"].to_numpy(),
+                median=boxes["median"].to_numpy(),
+                q3=boxes["q3"].to_numpy(),
+                lowerfence=boxes["lowerfence"].to_numpy(),
+                upperfence=boxes["upperfence"].to_numpy(),
+                boxpoints=False,
+                marker=dict(color=trace_color),
+                orientation="v",
+                showlegend=True,
+            )
+        )
+
+        points = df[(df[color] == group) & df[x].notna() & df[y].notna()]
+        point_categories = points[x].astype(str)
+        jitter = rng.uniform(-JITTER, JITTER, len(points))
+        # positions are rounded to a thousandth of a category, far below a
+        # pixel, to keep their JSON short
+        point_positions = (
+            point_categories.map(category_positions).to_numpy()
+            + offset
+            + (POINT_POSITION + jitter) * half_width
+        ).round(3)
+        traces.append(
+            dict(
+                type="scattergl",
+                mode="markers",
+                name=str(group),
+                legendgroup=str(group),
+                x=point_positions,
+                y=points[y].to_numpy(),
+                # the category is shown by the axis, not repeated per point
+                hovertemplate=f"{labels.get(y, y)}=%{{y}}"
+                "<extra>%{fullData.name}</extra>",
+                marker=dict(color=trace_color),
+                showlegend=False,
+            )
+        )
+
+    fig = go.Figure(data=traces)
+    fig.update_layout(
+        template=template,
+        boxmode="overlay",
+        xaxis=dict(
+            title_text=labels.get(x, x),
+            tickmode="array",
+            tickvals=list(range(len(categories))),
+            ticktext=list(categories),
+            range=[-0.5, len(categories) - 0.5],
+            zeroline=False,
+            showgrid=False,
+        ),
+        yaxis_title_text=labels.get(y, y),
+        legend=dict(title_text=labels.get(color, color), tracegroupgap=0),
+        margin=dict(t=60),
+    )
+    return fig
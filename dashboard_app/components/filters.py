@@ -1,25 +1,13 @@
 from dash import html, dcc
 import dash_bootstrap_components as dbc
-import pandas as pd
-from pathlib import Path
+from dashboard_app.outlier_filter import get_threshold_unit
 
-# Import utility functions from helpers
-from dashboard_app.helpers.get_naics_descriptions import get_naics_descriptions
-from dashboard_app.helpers.get_wildcard_patterns import get_wildcard_patterns
-from dashboard_app.helpers.filter_outliers import filter_outliers
-from dashboard_app.helpers.apply_wildcard_filter import apply_wildcard_filter
-
-
-def create_filters(df):
-    # Get unique values for each filter
-    unique_states = sorted(df["state"].dropna().unique())
-    unique_arc_codes = sorted(df["arc2"].dropna().unique())
-    unique_naics_codes = sorted(df["naics_imputed"].dropna().unique())
-
-    # Generate wildcard options
-    arc_wildcards = get_wildcard_patterns(unique_arc_codes, "arc", df)
-    naics_wildcards = get_wildcard_patterns(unique_naics_codes, "naics")
 
+def create_filters(filter_options):
+    # filter_options is computed by helpers.get_filter_options, either at
+    # startup or offline by the data pipeline (see data_loader.py)
+    # the outlier threshold is in σ, IQR or MAD depending on OUTLIER_METHOD
+    unit = get_threshold_unit()
     return html.Div(
         [
             # First row - Year slider and Implementation Status
@@ -39,12 +27,12 @@ def create_filters(df):
                                 [
                                     dcc.RangeSlider(
                                         id="fy-filter",
-                                        min=df["fy"].min(),
-                                        max=df["fy"].max(),
+                                        min=filter_options["fy_min"],
+                                        max=filter_options["fy_max"],
                                         marks=None,
                                         value=[
-                                            df["fy"].min(),
-                                            df["fy"].max(),
+                                            filter_options["fy_min"],
+                                            filter_options["fy_max"],
                                         ],
                                         dots=False,
                                         step=1,
@@ -68,7 +56,7 @@ def create_filters(df):
                     dbc.Col(
                         [
                             html.Label(
-                                "Outlier Exclusion Threshold (σ):",
+                                f"Outlier Exclusion Threshold ({unit.strip()}):",
                                 className="filter-label",
                             ),
                             html.Div(
@@ -78,8 +66,8 @@ def create_filters(df):
                                         min=0,
                                         max=3,
                                         step=0.1,
-                                        marks={0: "0σ", 1: "1σ", 2: "2σ", 3: "3σ"},
-                                        value=2,  # Have 2σ automatic outlier filtering
+                                        marks={i: f"{i}{unit}" for i in range(4)},
+                                        value=2,  # Have 2-unit automatic outlier filtering
                                         persistence=True,
                                         persistence_type="session",
                                         tooltip={
@@ -181,20 +169,8 @@ def create_filters(df):
                             html.Label("Sector:", className="filter-label"),
                             dcc.Dropdown(
                                 id="sector-filter",
-                                options=naics_wildcards
-                                + [
-                                    {
-                                        "label": f"{row['naics_imputed']} - {row['naics_description']}",
-                                        "value": row["naics_imputed"],
-                                    }
-                                    for _, row in (
-                                        df[["naics_imputed", "naics_description"]]
-                                        .dropna()
-                                        .drop_duplicates()
-                                        .sort_values("naics_imputed")
-                                        .iterrows()
-                                    )
-                                ],
+                                options=filter_options["naics_wildcards"]
+                                + filter_options["naics_options"],
                                 placeholder="All sectors",  # UPDATED PLACEHOLDER
                                 multi=True,
                                 value=["332*"],
@@ -214,20 +190,8 @@ def create_filters(df):
                             ),
                             dcc.Dropdown(
                                 id="arc-filter",
-                                options=arc_wildcards
-                                + [
-                                    {
-                                        "label": f"{row['arc2']} - {row['specific_description']}",
-                                        "value": row["arc2"],
-                                    }
-                                    for _, row in (
-                                        df[["arc2", "specific_description"]]
-                                        .dropna()
-                                        .drop_duplicates()
-                                        .sort_values("arc2")
-                                        .iterrows()
-                                    )
-                                ],
+                                options=filter_options["arc_wildcards"]
+                                + filter_options["arc_options"],
                                 placeholder="All recommendations",  # UPDATED PLACEHOLDER
                                 multi=True,
                                 value=["2.2511", "2.2514"],
@@ -244,10 +208,7 @@ def create_filters(df):
                             html.Label("State:", className="filter-label"),
                             dcc.Dropdown(
                                 id="state-filter",
-                                options=[
-                                    {"label": str(val), "value": val}
-                                    for val in unique_states
-                                ],
+                                options=filter_options["state_options"],
                                 placeholder="All states",  # UPDATED PLACEHOLDER
                                 multi=True,
                                 value=["CA", "TX", "CO"],
@@ -0,0 +1,265 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import sys
+import threading
+
+import flask
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# responses smaller than this are sent uncompressed
+DEFAULT_MIN_SIZE = 1024
+
+# gzip level of the responses compressed on the fly; precompressed assets use
+# the highest level, as they are compressed once
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "application/javascript",
+    "application/pdf",
+    "image/svg+xml",
+    "text/css",
+    "text/html",
+    "text/javascript",
+    "text/plain",
+}
+
+# precompressed variants of the assets, by content encoding
+ASSET_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+# asset file types worth precompressing
+ASSET_EXTENSIONS = {".css", ".html", ".js", ".json", ".pdf", ".svg", ".txt"}
+
+# Cache-Control max-age of assets whose URL carries Dash's modification time
+# (?m=...) and of the other assets, which keep their URL when they change
+VERSIONED_ASSET_MAX_AGE = 365 * 24 * 3600
+ASSET_MAX_AGE = 3600
+
+
+def choose_encoding(accept_encoding):
+    """
+    Return the preferred content encoding the client accepts, or None.
+
+    The encoding with the highest q-value wins, brotli on a tie. A q-value of
+    0 (e.g. "gzip;q=0" or "br; q=0.0") refuses the encoding, and so does an
+    invalid one.
+    """
+    qualities = {}
+    for part in accept_encoding.split(","):
+        name, *params = part.split(";")
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.strip().lower()] = quality
+    encodings = (["br"] if brotli is not None else []) + ["gzip"]
+    best = max(encodings, key=lambda encoding: qualities.get(encoding, 0.0))
+    if qualities.get(best, 0.0) <= 0:
+        return None
+    return best
+
+
+def compress(data, encoding, best=False):
+    if encoding == "br":
+        return brotli.compress(data, quality=11 if best else BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=9 if best else GZIP_LEVEL, mtime=0)
+
+
+def precompress_assets(assets_folder, min_size=DEFAULT_MIN_SIZE):
+    """
+    Write gzip (and, with the brotli package, brotli) variants next to the
+    compressible files of the assets folder, e.g. styles.css.gz. Variants
+    newer than their file are kept.
+
+    Returns:
+        Number of variants written
+    """
+    encodings = ["gzip"] + (["br"] if brotli is not None else [])
+    written = 0
+    for folder, _, files in os.walk(assets_folder):
+        for name in files:
+            path = os.path.join(folder, name)
+            if os.path.splitext(name)[1].lower() not in ASSET_EXTENSIONS:
+                continue
+            if os.path.getsize(path) < min_size:
+                continue
+            for encoding in encodings:
+                variant_path = path + ASSET_SUFFIXES[encoding]
+                if os.path.exists(variant_path) and os.path.getmtime(
+                    variant_path
+                ) >= os.path.getmtime(path):
+                    continue
+                with open(path, "rb") as f:
+                    data = compress(f.read(), encoding, best=True)
+                with open(variant_path, "wb") as f:
+                    f.write(data)
+                written += 1
+    return written
+
+
+def enable_compression(app, min_size=None):
+    """
+    Compress the responses of a Dash app's Flask server.
+
+    - Callback, layout and other generated responses larger than min_size
+      are compressed on the fly (brotli if installed and accepted, otherwise
+      gzip). The fingerprinted component bundles (plotly.js and the Dash
+      renderer) are compressed once and kept in memory.
+    - Compressible assets are served from their precompressed variants (see
+      precompress_assets) when present. Otherwise they are compressed on
+      their first request and kept in memory until the file changes, e.g.
+      when dashboard_app is bind-mounted over the image's variants. Both
+      get an ETag and Cache-Control headers.
+    - Responses that carry an ETag (the component bundles without a
+      fingerprint) get the encoding appended to it, so a cached compressed
+      body is never taken for the uncompressed one, and are answered with
+      304 Not Modified when the client already has them.
+
+    Args:
+        app: Dash app
+        min_size: Smallest response to compress, in bytes (default
+            COMPRESS_MIN_SIZE, or DEFAULT_MIN_SIZE)
+    """
+    if min_size is None:
+        min_size = int(os.getenv("COMPRESS_MIN_SIZE", DEFAULT_MIN_SIZE))
+    server = app.server
+    assets_folder = app.config.assets_folder
+    assets_prefix = (
+        app.config.routes_pathname_prefix + app.config.assets_url_path.lstrip("/")
+    ).rstrip("/") + "/"
+    suites_prefix = app.config.routes_pathname_prefix + "_dash-component-suites/"
+    compressed_bundles = {}
+    bundles_lock = threading.Lock()
+    # (asset path, encoding) -> (modification time, compressed bytes, etag)
+    compressed_assets = {}
+    assets_lock = threading.Lock()
+
+    def get_compressed_asset(asset_path, encoding):
+        key = (asset_path, encoding)
+        mtime = os.path.getmtime(asset_path)
+        with assets_lock:
+            entry = compressed_assets.get(key)
+        if entry is None or entry[0] != mtime:
+            with open(asset_path, "rb") as f:
+                data = compress(f.read(), encoding, best=True)
+            entry = (mtime, data, hashlib.md5(data).hexdigest())
+            with assets_lock:
+                compressed_assets[key] = entry
+        return entry
+
+    @server.before_request
+    def serve_compressed_asset():
+        request = flask.request
+        # range requests (PDF viewers) get the file itself
+        if (
+            request.method != "GET"
+            or not request.path.startswith(assets_prefix)
+            or "Range" in request.headers
+        ):
+            return None
+        encoding = choose_encoding(request.headers.get("Accept-Encoding", ""))
+        if encoding is None:
+            return None
+        asset_path = safe_join(assets_folder, request.path[len(assets_prefix) :])
+        if asset_path is None or not os.path.isfile(asset_path):
+            return None
+        if (
+            os.path.splitext(asset_path)[1].lower() not in ASSET_EXTENSIONS
+            or os.path.getsize(asset_path) < min_size
+        ):
+            return None
+        mimetype = mimetypes.guess_type(asset_path)[0] or "application/octet-stream"
+        variant_path = asset_path + ASSET_SUFFIXES[encoding]
+        if os.path.isfile(variant_path) and os.path.getmtime(
+            variant_path
+        ) >= os.path.getmtime(asset_path):
+            response = flask.send_file(
+                variant_path,
+                mimetype=mimetype,
+                download_name=os.path.basename(asset_path),
+                conditional=True,
+                etag=True,
+            )
+        else:
+            mtime, data, etag = get_compressed_asset(asset_path, encoding)
+            response = flask.Response(data, mimetype=mimetype)
+            response.set_etag(etag)
+            response.last_modified = mtime
+            response.make_conditional(request)
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+    @server.after_request
+    def compress_response(response):
+        request = flask.request
+        if request.path.startswith(assets_prefix):
+            response.headers.add("Vary", "Accept-Encoding")
+            # errors (e.g. a missing asset) must not be cached as the asset
+            if response.status_code not in (200, 304):
+                return response
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = (
+                VERSIONED_ASSET_MAX_AGE if "m" in request.args else ASSET_MAX_AGE
+            )
+            return response
+
+        if (
+            response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        ):
+            return response
+        encoding = choose_encoding(request.headers.get("Accept-Encoding", ""))
+        if encoding is None:
+            return response
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+
+        if request.path.startswith(suites_prefix):
+            # the bundles never change while the server runs
+            key = (request.full_path, encoding)
+            with bundles_lock:
+                compressed = compressed_bundles.get(key)
+            if compressed is None:
+                compressed = compress(data, encoding)
+                with bundles_lock:
+                    compressed_bundles[key] = compressed
+        else:
+            compressed = compress(data, encoding)
+
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        response.headers.add("Vary", "Accept-Encoding")
+        etag, weak = response.get_etag()
+        if etag:
+            # Dash compares If-None-Match with the ETag of the uncompressed
+            # body, so the client's tag of this body is checked here
+            response.set_etag(f"{etag}-{encoding}", weak)
+            response.make_conditional(request)
+        return response
+
+
+if __name__ == "__main__":
+    # run at image build time: python -m dashboard_app.compression [folder]
+    folder = (
+        sys.argv[1]
+        if len(sys.argv) > 1
+        else os.path.join(os.path.dirname(__file__), "assets")
+    )
+    print(f"Precompressed {precompress_assets(folder)} asset variants in {folder}")
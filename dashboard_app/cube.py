@@ -0,0 +1,123 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from dashboard_app.data_loader import SERVING_FRAMES
+
+
+class Cube:
+    """
+    Additive aggregates of the boxplot values per filter cell.
+
+    For every boxplot frame (the measure, keyed as in SERVING_FRAMES) the
+    cube holds the count, sum and sum of squares of its value column in each
+    filter cell (see data_loader.build_serving_frames). Counts, sums, means
+    and standard deviations over any filter selection, overall or per value
+    of a filter dimension, are then rolled up from these arrays without
+    reading the rows.
+
+    Rows with a missing value are not counted.
+    """
+
+    def __init__(self, frames, cells):
+        self.cells = cells
+        self.n_cells = len(cells)
+        self.counts = {}
+        self.sums = {}
+        self.squares = {}
+        for name, df in frames.items():
+            value_column = SERVING_FRAMES[name][1]
+            values = df[value_column].to_numpy(dtype=np.float64, na_value=np.nan)
+            present = ~np.isnan(values)
+            values = values[present]
+            cell_ids = df["cell_id"].to_numpy()[present]
+            self.counts[name] = np.bincount(cell_ids, minlength=self.n_cells).astype(
+                np.int32
+            )
+            self.sums[name] = np.bincount(
+                cell_ids, weights=values, minlength=self.n_cells
+            )
+            self.squares[name] = np.bincount(
+                cell_ids, weights=values * values, minlength=self.n_cells
+            )
+        self._dimensions = {}
+        self._lock = threading.Lock()
+
+    def dimension_codes(self, column, prefix_length=None):
+        """
+        Number the values of a filter dimension of the cells.
+
+        Args:
+            column: Cell column, e.g. "state" or "naics_imputed"
+            prefix_length: Group string values by their first characters
+                (e.g. 3 for NAICS subsectors) instead of the full value
+
+        Returns:
+            (codes, labels): the code of every cell (-1 for a missing value)
+            and the sorted labels of the codes
+        """
+        key = (column, prefix_length)
+        with self._lock:
+            if key not in self._dimensions:
+                values = self.cells[column]
+                if prefix_length is not None:
+                    values = values.astype(str).str[:prefix_length].where(
+                        values.notna()
+                    )
+                codes, labels = pd.factorize(values, sort=True)
+                self._dimensions[key] = (codes, labels)
+            return self._dimensions[key]
+
+    def rollup(self, measure, cell_mask=None, by=None, prefix_length=None):
+        """
+        Aggregate a measure over the selected cells.
+
+        Args:
+            measure: Boxplot frame name, e.g. "cost" or "co2"
+            cell_mask: Boolean array marking the selected cells (None: all)
+            by: Cell column to group by (None: one overall total)
+            prefix_length: See dimension_codes
+
+        Returns:
+            DataFrame with count, sum, mean and std (sample standard
+            deviation), indexed by the values of `by` that have rows in
+            the selection, or a single row "all"
+        """
+        counts = self.counts[measure]
+        sums = self.sums[measure]
+        squares = self.squares[measure]
+        if cell_mask is None:
+            cell_mask = np.ones(self.n_cells, dtype=bool)
+
+        if by is None:
+            codes = np.zeros(self.n_cells, dtype=np.int64)
+            labels = pd.Index(["all"])
+        else:
+            codes, labels = self.dimension_codes(by, prefix_length)
+        selected = cell_mask & (codes >= 0)
+        codes = codes[selected]
+
+        count = np.bincount(codes, weights=counts[selected], minlength=len(labels))
+        total = np.bincount(codes, weights=sums[selected], minlength=len(labels))
+        total_squares = np.bincount(
+            codes, weights=squares[selected], minlength=len(labels)
+        )
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = total / count
+            variance = (total_squares - count * mean * mean) / (count - 1)
+        std = np.sqrt(np.maximum(variance, 0))
+        std[count < 2] = np.nan
+
+        result = pd.DataFrame(
+            {
+                "count": count.astype(np.int64),
+                "sum": total,
+                "mean": mean,
+                "std": std,
+            },
+            index=pd.Index(labels, name=by),
+        )
+        if by is not None:
+            result = result[result["count"] > 0]
+        return result
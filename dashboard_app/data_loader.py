@@ -1,15 +1,105 @@
 from pathlib import Path
 import pandas as pd
 import os
+import sys
+import json
 import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from dashboard_app.filter_engine import get_cell_offsets
+from dashboard_app.filter_index import FILTER_DIMENSIONS
+from dashboard_app.helpers.get_filter_options import get_filter_options
+from dashboard_app.quantile_sketch import get_cell_boxes
+from dashboard_app.row_sampler import get_sampling_order
 
 # Converting to a categorical data type is a memory optimization technique that:
 # - Stores each unique value only once
 # - Uses integer codes to reference these values
 # - Maintains the exact same data, just in a more memory-efficient format
 
+# Columns of iac_integrated.csv used by the dashboard and their dtypes. All
+# other columns (ids, free text, intermediate factors) are never read.
+# Every string column here has few distinct values, so all of them are
+# dictionary-encoded; measures are float32 and years 16-bit integers.
+SERVING_SCHEMA = {
+    "fy": "Int16",
+    "reference_year": "Int16",
+    "naics_description": "category",
+    "naics_imputed": "category",
+    "state": "category",
+    "arc2": "category",
+    "specific_description": "category",
+    "impstatus": "category",
+    "main_code": "category",
+    "main_description": "category",
+    "sub_code": "category",
+    "sub_description": "category",
+    "emission_type": "category",
+    "sourccode": "category",
+    "impcost_adj": "float32",
+    "payback_imputed": "float32",
+    "emissions_avoided": "float32",
+    "conserved": "float32",
+}
 
-def load_integrated_dataset():
+# Bump this whenever the dtype handling below or the layout of the serving
+# frames changes so that existing caches and bundles are rebuilt instead of
+# silently served with the old schema.
+CACHE_FORMAT_VERSION = 7
+
+# key under which the source fingerprint is stored in the parquet schema metadata
+CACHE_METADATA_KEY = b"iac_source_fingerprint"
+
+# columns used by the filter panel
+FILTER_COLUMNS = [
+    "fy",
+    "naics_description",
+    "naics_imputed",
+    "state",
+    "arc2",
+    "specific_description",
+    "impstatus",
+    "reference_year",
+    "main_code",
+    "main_description",
+    "sub_code",
+    "sub_description",
+]
+
+# columns shared by every boxplot frame
+DIMENSION_COLUMNS = [
+    "fy",
+    "naics_description",
+    "naics_imputed",
+    "state",
+    "arc2",
+    "specific_description",
+    "impstatus",
+]
+
+# sort order of the filter cells, and so of the rows of every boxplot frame:
+# rows sharing a sector, ARC code and year (and so the rows matched by a NAICS
+# or ARC wildcard or a year range) are stored next to each other
+CLUSTER_COLUMNS = ["naics_imputed", "arc2", "fy"]
+
+# boxplot frame name -> (row selection, value column)
+# a row selection of None keeps every row of the integrated dataset
+SERVING_FRAMES = {
+    "cost": (None, "impcost_adj"),
+    "payback": (None, "payback_imputed"),
+    "co2": (lambda df: df["emission_type"] == "CO2", "emissions_avoided"),
+    "nox": (lambda df: df["emission_type"] == "NOx", "emissions_avoided"),
+    "so2": (lambda df: df["emission_type"] == "SO2", "emissions_avoided"),
+    "electricity": (lambda df: df["sourccode"].isin(["EC"]), "conserved"),
+    "natural_gas": (lambda df: df["sourccode"].isin(["E2"]), "conserved"),
+    "fuels": (lambda df: ~df["sourccode"].isin(["EC", "ED", "EF"]), "conserved"),
+}
+
+# name of the directory (next to the CSV) holding the serving bundle
+SERVING_BUNDLE_DIR_NAME = "iac_serving"
+
+
+def get_data_path():
     # get data path from environment variable or construct default path
     data_dir = os.getenv("DATA_DIR")
 
@@ -22,51 +112,440 @@ def load_integrated_dataset():
         data_dir = project_root / "data" / "final"
         data_path = data_dir / "iac_integrated.csv"
 
-    if not data_path.exists():
-        raise FileNotFoundError(f"Data file not found at: {data_path}")
-    # debug print
-    # print(f"\nFile size: {data_path.stat().st_size:,} bytes")
+    return data_path
+
+
+def get_source_fingerprint(data_path):
+    """
+    Identify a version of the integrated CSV by its size and modification time.
+
+    The pipeline rewrites the whole file, so any new run changes at least one
+    of the two values.
+    """
+    stat = Path(data_path).stat()
+    return {
+        "file": Path(data_path).name,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "cache_format": CACHE_FORMAT_VERSION,
+    }
+
+
+def get_dataset_version(fingerprint):
+    # short, stable identifier of a data version, e.g. for cache keys and logs
+    return f"{fingerprint['mtime_ns']}-{fingerprint['size']}-v{fingerprint['cache_format']}"
+
+
+def get_bundle_dir(data_path):
+    return Path(data_path).parent / SERVING_BUNDLE_DIR_NAME
+
+
+def get_cache_path(data_path):
+    # the cache lives next to the CSV, e.g. data/final/iac_integrated.parquet
+    return Path(data_path).with_suffix(".parquet")
+
+
+def read_cached_dataset(cache_path, fingerprint):
+    """
+    Return the cached DataFrame if it was built from the same CSV, else None.
+    """
+    if not cache_path.exists():
+        return None
+    try:
+        metadata = pq.read_schema(cache_path).metadata or {}
+        cached_fingerprint = json.loads(metadata.get(CACHE_METADATA_KEY, b"null"))
+        if cached_fingerprint != fingerprint:
+            return None
+        return pq.read_table(cache_path).to_pandas()
+    except (OSError, ValueError, pa.ArrowException) as e:
+        print(f"Ignoring unreadable dataset cache {cache_path}: {e}")
+        return None
+
 
-    # load data with optimized dtypes for improved performance
+def write_cached_dataset(df, cache_path, fingerprint):
+    """
+    Write the processed DataFrame to a parquet file tagged with the CSV fingerprint.
+
+    The file is written under a temporary name and renamed into place, so other
+    worker processes never observe a partially written cache.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[CACHE_METADATA_KEY] = json.dumps(fingerprint).encode()
+    table = table.replace_schema_metadata(metadata)
+
+    tmp_path = cache_path.with_name(f".{cache_path.name}.{os.getpid()}.tmp")
+    try:
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        # e.g. read-only data volume; the dashboard still works without a cache
+        print(f"Could not write dataset cache {cache_path}: {e}")
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def estimate_default_memory(df):
+    """
+    Estimate the bytes the columns of df would take as Python string objects
+    and 64-bit numbers (how pandas loads them without a schema), as the
+    baseline of the memory report.
+    """
+    total = 0
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # every row would hold its own reference to a string object
+            counts = series.cat.codes.value_counts()
+            sizes = np.array(
+                [
+                    sys.getsizeof(str(series.cat.categories[code]))
+                    if code >= 0
+                    else sys.getsizeof(np.nan)
+                    for code in counts.index
+                ]
+            )
+            total += 8 * len(series) + int((sizes * counts.to_numpy()).sum())
+        else:
+            total += 8 * len(series)
+    return total
+
+
+def report_memory(df, source_path):
+    # the object/64-bit size is estimated, as the data is never loaded that way
+    before = estimate_default_memory(df)
+    after = df.memory_usage(deep=True).sum()
+    print(
+        f"Loaded {source_path.name}: {len(df):,} rows x {len(df.columns)} columns, "
+        f"{after / 1e6:,.1f} MB with the serving schema "
+        f"(estimated {before / 1e6:,.1f} MB as object/64-bit columns)"
+    )
+
+
+def read_integrated_csv(data_path):
+    # load only the columns in the serving schema, parsed straight into their compact dtypes
     integrated_df = pd.read_csv(
         data_path,
-        dtype={
-            "fy": "Int16",
-            "reference_year": "Int64",
-            "base_year": "Int64",
-            "naics_description": "category",
-            "naics_imputed": "category",
-            "state": "category",
-            "arc2": "category",
-            "specific_description": "category",
-            "impcost_adj": "float32",
-            "payback": "float32",
-            "impstatus": "string",  # force string type for impstatus
-        },
+        usecols=list(SERVING_SCHEMA),
+        dtype=SERVING_SCHEMA,
         na_values=["nan", "NaN", "NAN", ""],  # explicitly handle NA values
     )
 
     # clean up impstatus column - replace NaN with 'Unknown'
-    integrated_df["impstatus"] = integrated_df["impstatus"].fillna("K")
-
-    # convert string columns that have < 100 unique values to categorical for improved performance
-    skip_cols = [
-        "naics_description",
-        "naics_imputed",
-        "state",
-        "arc2",
-        "specific_description",
-        "impstatus",
-        "emission_type",
-        "sourccode",
+    impstatus = integrated_df["impstatus"]
+    if "K" not in impstatus.cat.categories:
+        impstatus = impstatus.cat.add_categories("K")
+    integrated_df["impstatus"] = impstatus.fillna("K")
+
+    return integrated_df
+
+
+def load_integrated_dataset(use_cache=True):
+    data_path = get_data_path()
+
+    if not data_path.exists():
+        raise FileNotFoundError(f"Data file not found at: {data_path}")
+    # debug print
+    # print(f"\nFile size: {data_path.stat().st_size:,} bytes")
+
+    # reuse the columnar cache when it was built from this exact CSV
+    cache_path = get_cache_path(data_path)
+    fingerprint = get_source_fingerprint(data_path)
+    integrated_df = None
+    source_path = cache_path
+    if use_cache:
+        integrated_df = read_cached_dataset(cache_path, fingerprint)
+
+    if integrated_df is None:
+        integrated_df = read_integrated_csv(data_path)
+        source_path = data_path
+        if use_cache:
+            write_cached_dataset(integrated_df, cache_path, fingerprint)
+
+    report_memory(integrated_df, source_path)
+
+    return integrated_df
+
+
+def get_cell_ids(df, columns):
+    """
+    Number the distinct combinations of columns in their sorted order.
+
+    Missing values are a value of their own, sorting first. (groupby().ngroup()
+    with dropna=False returns NaN for them on categorical columns.)
+
+    Returns:
+        int32 array with the number of every row's combination
+    """
+    keys = np.zeros(len(df), dtype=np.int64)
+    for column in columns:
+        codes, uniques = pd.factorize(df[column], sort=True)
+        keys = keys * (len(uniques) + 1) + (codes + 1)
+    return np.unique(keys, return_inverse=True)[1].astype(np.int32)
+
+
+def build_serving_frames(integrated_df):
+    """
+    Project the integrated dataset into the frames used by the dashboard.
+
+    Returns a dictionary with the filter panel frame under "filters", the
+    filter cells under "cells" and one de-duplicated frame per boxplot, keyed
+    as in SERVING_FRAMES.
+
+    A cell is one distinct combination of the filter dimensions. Every
+    boxplot row carries the id of its cell (row number in the cells frame),
+    so a filter can be evaluated once over the cells and then applied to all
+    boxplot frames.
+
+    Cells are numbered in the order of CLUSTER_COLUMNS and the boxplot rows
+    are sorted by cell, so the rows of each cell form one contiguous run of
+    every frame (see filter_engine.FilterEngine.select).
+    """
+    sort_columns = CLUSTER_COLUMNS + [
+        column for column in FILTER_DIMENSIONS if column not in CLUSTER_COLUMNS
     ]
-    categorical_threshold = 100
+    cell_ids = pd.Series(
+        get_cell_ids(integrated_df, sort_columns), index=integrated_df.index
+    )
+    first_rows = ~cell_ids.duplicated().to_numpy()
+    cells = integrated_df.loc[first_rows, FILTER_DIMENSIONS]
+    cells = cells.iloc[np.argsort(cell_ids.to_numpy()[first_rows])]
+    integrated_df = integrated_df.assign(cell_id=cell_ids)
+
+    frames = {
+        "filters": integrated_df[FILTER_COLUMNS].drop_duplicates(),
+        "cells": cells.reset_index(drop=True),
+    }
+    for name, (select_rows, value_column) in SERVING_FRAMES.items():
+        rows = integrated_df if select_rows is None else integrated_df[
+            select_rows(integrated_df)
+        ]
+        frames[name] = (
+            rows[DIMENSION_COLUMNS + ["cell_id", value_column]]
+            .drop_duplicates()
+            .sort_values("cell_id", kind="stable")
+        )
+    return frames
+
+
+def build_row_indexes(frames, cells):
+    """
+    Build the indexes over the rows of the boxplot frames that the serving
+    bundle stores next to them, so that workers memory-map them instead of
+    each building a private copy.
+
+    Returns:
+        (cell_offsets, sampling_orders): a DataFrame with the cell offsets of
+        every frame in one column (see filter_engine.get_cell_offsets), and
+        the sampling order of every frame (see row_sampler.get_sampling_order),
+        keyed as in SERVING_FRAMES
+    """
+    cell_boxes, _ = get_cell_boxes(cells)
+    cell_offsets = pd.DataFrame(
+        {name: get_cell_offsets(frames[name], len(cells)) for name in SERVING_FRAMES}
+    )
+    sampling_orders = {
+        name: get_sampling_order(frames[name], cell_boxes) for name in SERVING_FRAMES
+    }
+    return cell_offsets, sampling_orders
+
+
+def frame_to_arrow(df):
+    """
+    Convert a serving frame to an Arrow table that maps back without copies.
+
+    Strings are dictionary-encoded and NaN stays a float value instead of
+    becoming an Arrow null, because columns with nulls cannot be handed to
+    pandas as views over the mapped file.
+    """
+    arrays = {}
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            arrays[col] = pa.array(series)
+        elif pd.api.types.is_string_dtype(series.dtype):
+            arrays[col] = pa.array(series.astype("category"))
+        elif pd.api.types.is_extension_array_dtype(series.dtype):
+            # nullable integers (e.g. fy) only stay nullable if they hold NA
+            if series.isna().any():
+                arrays[col] = pa.array(series)
+            else:
+                arrays[col] = pa.array(series.to_numpy(series.dtype.numpy_dtype))
+        else:
+            arrays[col] = pa.array(series.to_numpy())
+    return pa.table(arrays)
+
+
+def write_serving_bundle(
+    frames,
+    cells,
+    cell_offsets,
+    sampling_orders,
+    filter_options,
+    bundle_dir,
+    fingerprint,
+):
+    """
+    Write the serving bundle: one uncompressed Arrow IPC file per boxplot
+    frame, for the filter cells and for the row indexes (see
+    build_row_indexes), the filter options as JSON, and a manifest.
+
+    The manifest is written last, so a directory whose manifest matches the
+    CSV fingerprint always holds a complete bundle.
+    """
+    bundle_dir.mkdir(parents=True, exist_ok=True)
+    arrow_files = {f"{name}.arrow": frame for name, frame in frames.items()}
+    arrow_files["cells.arrow"] = cells
+    arrow_files["cell_offsets.arrow"] = cell_offsets
+    for name, sampling_order in sampling_orders.items():
+        arrow_files[f"{name}.sampling.arrow"] = sampling_order
+    for file_name, df in arrow_files.items():
+        table = frame_to_arrow(df)
+        path = bundle_dir / file_name
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with pa.OSFile(str(tmp_path), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+
+    files = {"filter_options.json": filter_options}
+    files["manifest.json"] = {
+        "source": fingerprint,
+        "frames": list(SERVING_FRAMES),
+        "cells": "cells.arrow",
+        "cell_offsets": "cell_offsets.arrow",
+        "sampling_orders": {
+            name: f"{name}.sampling.arrow" for name in sampling_orders
+        },
+        "filter_options": "filter_options.json",
+    }
+    for file_name, content in files.items():
+        path = bundle_dir / file_name
+        tmp_path = path.with_name(f".{file_name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(content, f, indent=2)
+        os.replace(tmp_path, path)
+
 
-    for col in integrated_df.select_dtypes(include=["object"]).columns:
+def read_bundle_manifest(bundle_dir):
+    try:
+        with open(bundle_dir / "manifest.json", "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def read_arrow_frame(path, memory_map=False):
+    """
+    Read an Arrow IPC file of the serving bundle into a DataFrame.
+
+    With memory_map=True the file is memory-mapped instead of read. Numeric
+    and dictionary-encoded columns without nulls are then zero-copy views over
+    the mapped file, so every worker process that maps the same file shares
+    one physical copy through the OS page cache.
+    """
+    if memory_map:
+        source = pa.memory_map(str(path), "r")
+    else:
+        source = pa.OSFile(str(path), "r")
+    table = pa.ipc.open_file(source).read_all()
+    # split_blocks keeps pandas from consolidating (copying) the columns
+    return table.to_pandas(split_blocks=True)
+
+
+def build_serving_bundle():
+    """
+    Build the boxplot frames and filter options from the integrated CSV and
+    publish them as a serving bundle next to it.
+
+    Called by tools/data_pipeline/integrate_data.py after each pipeline run,
+    and by the dashboard itself if it finds no bundle for the current CSV.
+
+    Returns:
+        (frames, cells, cell_offsets, sampling_orders, filter_options) as
+        written to the bundle
+    """
+    data_path = get_data_path()
+    fingerprint = get_source_fingerprint(data_path)
+
+    frames = build_serving_frames(load_integrated_dataset())
+    filter_options = get_filter_options(frames.pop("filters"))
+    cells = frames.pop("cells")
+    cell_offsets, sampling_orders = build_row_indexes(frames, cells)
+
+    bundle_dir = get_bundle_dir(data_path)
+    try:
+        write_serving_bundle(
+            frames,
+            cells,
+            cell_offsets,
+            sampling_orders,
+            filter_options,
+            bundle_dir,
+            fingerprint,
+        )
+    except OSError as e:
+        # e.g. read-only data volume; the dashboard can still use the frames
+        print(f"Could not write serving bundle to {bundle_dir}: {e}")
+
+    return frames, cells, cell_offsets, sampling_orders, filter_options
+
+
+def load_serving_bundle(load_mode=None):
+    """
+    Load the boxplot frames, filter cells, row indexes and filter options
+    from the serving bundle.
+
+    DATA_LOAD_MODE=memory (default) reads the frames into private memory in
+    every process. DATA_LOAD_MODE=mmap memory-maps them so that all server
+    workers share a single copy of the data.
+
+    Returns:
+        (frames, cells, cell_offsets, sampling_orders, filter_options,
+        version) where frames and sampling_orders are keyed as in
+        SERVING_FRAMES and version identifies the CSV they were built from
+    """
+    load_mode = load_mode or os.getenv("DATA_LOAD_MODE", "memory").lower()
+    if load_mode not in ("memory", "mmap"):
+        raise ValueError(f"Unknown DATA_LOAD_MODE: {load_mode}")
+
+    data_path = get_data_path()
+
+    if not data_path.exists():
+        raise FileNotFoundError(f"Data file not found at: {data_path}")
+
+    fingerprint = get_source_fingerprint(data_path)
+    version = get_dataset_version(fingerprint)
+    bundle_dir = get_bundle_dir(data_path)
+    manifest = read_bundle_manifest(bundle_dir)
+
+    # no bundle was published for this CSV (e.g. the CSV was copied in by
+    # hand), so build it now from the CSV
+    if manifest is None or manifest["source"] != fingerprint:
+        bundle = build_serving_bundle()
+        manifest = read_bundle_manifest(bundle_dir)
         if (
-            col not in skip_cols
-            and integrated_df[col].nunique() < categorical_threshold
+            load_mode == "memory"
+            or manifest is None
+            or manifest["source"] != fingerprint
         ):
-            integrated_df[col] = integrated_df[col].astype("category")
+            return bundle + (version,)
+        del bundle
 
-    return integrated_df
+    memory_map = load_mode == "mmap"
+    frames = {
+        name: read_arrow_frame(bundle_dir / f"{name}.arrow", memory_map=memory_map)
+        for name in manifest["frames"]
+    }
+    cells = read_arrow_frame(bundle_dir / manifest["cells"], memory_map=memory_map)
+    cell_offsets = read_arrow_frame(
+        bundle_dir / manifest["cell_offsets"], memory_map=memory_map
+    )
+    sampling_orders = {
+        name: read_arrow_frame(bundle_dir / file_name, memory_map=memory_map)
+        for name, file_name in manifest["sampling_orders"].items()
+    }
+    with open(bundle_dir / manifest["filter_options"], "r") as f:
+        filter_options = json.load(f)
+
+    return frames, cells, cell_offsets, sampling_orders, filter_options, version
@@ -0,0 +1,333 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+from dashboard_app.charts.box_statistics import get_boxplot_mode
+from dashboard_app.cube import Cube
+from dashboard_app.data_loader import (
+    SERVING_FRAMES,
+    get_bundle_dir,
+    get_data_path,
+    get_dataset_version,
+    get_source_fingerprint,
+    load_serving_bundle,
+    read_bundle_manifest,
+)
+from dashboard_app.filter_engine import FilterEngine
+from dashboard_app.helpers.get_filter_state import get_filter_state
+from dashboard_app.outlier_filter import OutlierFilter
+from dashboard_app.quantile_sketch import CellSketches, get_cell_boxes
+from dashboard_app.row_sampler import RowSampler, get_sampling_order
+
+# seconds between checks of data/final/ for a new dataset (0 disables reloading)
+DEFAULT_RELOAD_INTERVAL = 60
+
+# seconds to wait for the pipeline to publish the serving bundle of a new CSV
+# before the dashboard builds the bundle itself
+BUNDLE_GRACE_PERIOD = 300
+
+
+class Dataset:
+    """
+    One loaded version of the serving data and the filter engine built over it.
+
+    A Dataset is never modified after it is created; a new pipeline run
+    produces a new Dataset instead.
+    """
+
+    def __init__(
+        self,
+        frames,
+        cells,
+        filter_options,
+        version,
+        cell_offsets=None,
+        sampling_orders=None,
+    ):
+        self.frames = frames
+        self.filter_engine = FilterEngine(cells, frames, cell_offsets)
+        self.filter_options = filter_options
+        self.reference_year = filter_options["reference_year"]
+        self.version = version
+
+        # recommendations per cell (every one has a row in the cost frame), for
+        # the row counts of the filter options
+        self.cell_rows = np.bincount(
+            frames["cost"]["cell_id"].to_numpy(), minlength=len(cells)
+        )
+
+        # additive aggregates per cell, for rollups and the sketch outlier
+        # filter. There are about as many cells as rows, so the cube is as
+        # large as the data, in private memory of every worker: it is only
+        # built when first used (on load in BOXPLOT_MODE=sketch)
+        self._frames_and_cells = (frames, cells)
+        self._cube = None
+        self._cube_lock = threading.Lock()
+
+        # outlier rule of the slider (see OUTLIER_METHOD and OUTLIER_GROUPS)
+        self.outlier_filter = OutlierFilter()
+
+        boxplot_mode = get_boxplot_mode()
+        if boxplot_mode == "sketch":
+            # the sketch outlier filter reads it on every request
+            self.get_cube()
+        cell_boxes, box_keys = get_cell_boxes(cells)
+
+        # sampling ranks per row, for the drawn points of BOXPLOT_MODE=points
+        self.row_samplers = {}
+        if boxplot_mode == "points":
+            for name, df in frames.items():
+                if sampling_orders is not None and name in sampling_orders:
+                    sampling_order = sampling_orders[name]
+                else:
+                    sampling_order = get_sampling_order(df, cell_boxes)
+                self.row_samplers[name] = RowSampler(sampling_order)
+
+        # quantile sketches per cell, for BOXPLOT_MODE=sketch
+        self.box_sketches = {}
+        if boxplot_mode == "sketch":
+            outlier_filter = self.outlier_filter
+            if outlier_filter.method != "sigma" or outlier_filter.group_columns:
+                print(
+                    "BOXPLOT_MODE=sketch removes outliers by sigma over the whole "
+                    "selection; OUTLIER_METHOD and OUTLIER_GROUPS are ignored"
+                )
+            for name, df in frames.items():
+                value_column = SERVING_FRAMES[name][1]
+                self.box_sketches[name] = CellSketches(
+                    df, value_column, cell_boxes, box_keys
+                )
+
+    def get_cube(self):
+        with self._cube_lock:
+            if self._cube is None:
+                self._cube = Cube(*self._frames_and_cells)
+            return self._cube
+
+    @classmethod
+    def load(cls):
+        (
+            frames,
+            cells,
+            cell_offsets,
+            sampling_orders,
+            filter_options,
+            version,
+        ) = load_serving_bundle()
+        return cls(
+            frames, cells, filter_options, version, cell_offsets, sampling_orders
+        )
+
+    def select_rows(self, name, naics_imputed, fy_range, impstatus, arc2, state):
+        """
+        Return the positions of the rows of the boxplot frame `name` that
+        match the dashboard filters.
+        """
+        return self.filter_engine.select(
+            name, self.frames[name], naics_imputed, fy_range, impstatus, arc2, state
+        )
+
+    def select_rows_without_outliers(
+        self,
+        name,
+        naics_imputed,
+        fy_range,
+        impstatus,
+        arc2,
+        state,
+        outlier_column,
+        threshold,
+    ):
+        """
+        Return the positions of the rows of the boxplot frame `name` that
+        match the dashboard filters and are not outliers of outlier_column at
+        the slider's threshold (see outlier_filter.OutlierFilter.filter_rows).
+
+        The selection is cached per filter state with its values, groups
+        and outlier statistics, so moving the slider neither evaluates the
+        filters nor computes statistics again: the cached values are only
+        compared to the bounds at the new threshold.
+        """
+        filter_state = get_filter_state(
+            naics_imputed, fy_range, impstatus, arc2, state
+        )
+        return self.outlier_filter.filter_rows(
+            (name, filter_state),
+            self.frames[name],
+            outlier_column,
+            threshold,
+            lambda: self.select_rows(
+                name, naics_imputed, fy_range, impstatus, arc2, state
+            ),
+        )
+
+    def sample_rows(self, name, rows):
+        """
+        Return the rows of a selection of the boxplot frame `name` to draw as
+        points (see row_sampler.RowSampler.sample).
+        """
+        return self.row_samplers[name].sample(rows)
+
+    def rollup(
+        self,
+        name,
+        naics_imputed,
+        fy_range,
+        impstatus,
+        arc2,
+        state,
+        by=None,
+        prefix_length=None,
+    ):
+        """
+        Return the count, sum, mean and std of the boxplot frame `name` for
+        the dashboard filters, overall or per value of the cell column `by`
+        (see cube.Cube.rollup), without reading the rows.
+        """
+        filter_state = get_filter_state(
+            naics_imputed, fy_range, impstatus, arc2, state
+        )
+        cell_mask = self.filter_engine.cell_mask(filter_state)
+        return self.get_cube().rollup(name, cell_mask, by, prefix_length)
+
+    def count_filter_values(
+        self, column, values, naics_imputed, fy_range, impstatus, arc2, state
+    ):
+        """
+        Return the number of recommendations each value of the filter column
+        would select under the other dashboard filters (see
+        filter_engine.FilterEngine.value_counts).
+        """
+        filter_state = get_filter_state(
+            naics_imputed, fy_range, impstatus, arc2, state
+        )
+        return self.filter_engine.value_counts(
+            filter_state, column, values, self.cell_rows
+        )
+
+    def sketch_box_statistics(
+        self,
+        name,
+        naics_imputed,
+        fy_range,
+        impstatus,
+        arc2,
+        state,
+        outlier_column,
+        std_threshold,
+    ):
+        """
+        Return the boxes of the boxplot frame `name` for the dashboard
+        filters, merged from the sketches of the matching cells (see
+        quantile_sketch.CellSketches.box_statistics).
+        """
+        filter_state = get_filter_state(
+            naics_imputed, fy_range, impstatus, arc2, state
+        )
+        cell_mask = self.filter_engine.cell_mask(filter_state)
+
+        # like outlier_filter.OutlierFilter.filter_rows, which ignores a
+        # column missing from the frame, the filter only applies to the
+        # frame's own value column
+        value_range = None
+        if std_threshold and outlier_column == SERVING_FRAMES[name][1]:
+            total = self.get_cube().rollup(name, cell_mask).iloc[0]
+            if total["count"] > 0:
+                # a single value has no sample std; keep it like filter_rows
+                std = total["std"] if total["count"] > 1 else 0.0
+                value_range = (
+                    total["mean"] - std_threshold * std,
+                    total["mean"] + std_threshold * std,
+                )
+        return self.box_sketches[name].box_statistics(cell_mask, value_range)
+
+
+class DatasetHolder:
+    """
+    Holds the Dataset the callbacks read from and swaps in new versions.
+
+    A background thread polls data/final/ for a new iac_integrated.csv, loads
+    it while the current Dataset keeps serving, and then replaces the
+    reference. Callbacks read holder.current once per request, so requests
+    that are already running finish on the snapshot they started with.
+    """
+
+    def __init__(self, reload_interval=None):
+        if reload_interval is None:
+            reload_interval = float(
+                os.getenv("DATA_RELOAD_INTERVAL", DEFAULT_RELOAD_INTERVAL)
+            )
+        self.reload_interval = reload_interval
+        self._current = Dataset.load()
+        self._pending_version = None
+        self._pending_since = None
+        self._stop = threading.Event()
+
+    @property
+    def current(self):
+        return self._current
+
+    def start(self):
+        """
+        Start watching for new data in a daemon thread.
+
+        The thread is restarted in forked worker processes (e.g. gunicorn
+        with --preload), where threads of the parent do not survive.
+        """
+        if self.reload_interval <= 0:
+            return
+        os.register_at_fork(after_in_child=self._start_thread)
+        self._start_thread()
+
+    def stop(self):
+        self._stop.set()
+
+    def _start_thread(self):
+        thread = threading.Thread(
+            target=self._watch, name="dataset-watcher", daemon=True
+        )
+        thread.start()
+
+    def _watch(self):
+        while not self._stop.wait(self.reload_interval):
+            try:
+                self.check_for_new_version()
+            except Exception as e:
+                # keep serving the current data and try again on the next poll
+                print(f"Failed to reload dataset: {e}")
+
+    def check_for_new_version(self):
+        """
+        Load and swap in a new Dataset if the CSV has changed.
+
+        Returns:
+            True if a new Dataset was swapped in
+        """
+        data_path = get_data_path()
+        if not data_path.exists():
+            return False
+
+        fingerprint = get_source_fingerprint(data_path)
+        version = get_dataset_version(fingerprint)
+        if version == self._current.version:
+            self._pending_version = None
+            return False
+
+        # the pipeline writes the CSV first and the serving bundle right
+        # after; wait for the bundle rather than rebuilding it here
+        manifest = read_bundle_manifest(get_bundle_dir(data_path))
+        bundle_ready = manifest is not None and manifest["source"] == fingerprint
+        if not bundle_ready:
+            if self._pending_version != version:
+                self._pending_version = version
+                self._pending_since = time.monotonic()
+            if time.monotonic() - self._pending_since < BUNDLE_GRACE_PERIOD:
+                return False
+
+        dataset = Dataset.load()
+        self._current = dataset
+        self._pending_version = None
+        print(f"Loaded dataset version {dataset.version}")
+        return True
@@ -0,0 +1,112 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+
+# default limits of the figure cache of each server process
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_MB = 64
+
+
+class FigureCache:
+    """
+    Bounded LRU cache of chart figures, shared by the boxplot callbacks.
+
+    The same filter combinations are requested over and over (the default
+    view, popular sectors and states), and building a boxplot figure takes
+    far longer than looking it up. Callers key the figures by chart name,
+    dataset version and canonical filter state (see helpers.get_filter_state),
+    so figures of an old dataset version are never served and simply age out.
+
+    The cache holds at most max_entries figures and max_bytes of figure
+    JSON; the least recently used figures are evicted first.
+
+    With a disk_store (see figure_store.DiskFigureStore), figures missing from
+    this worker's cache are looked up in the store shared by all workers, and
+    every figure built here is added to it.
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None, disk_store=None):
+        if max_entries is None:
+            max_entries = int(
+                os.getenv("FIGURE_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)
+            )
+        if max_bytes is None:
+            max_bytes = int(
+                float(os.getenv("FIGURE_CACHE_MAX_MB", DEFAULT_MAX_MB)) * 1024**2
+            )
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # a store configured off (FIGURE_CACHE_DISK_MB=0) is not consulted
+        if disk_store is not None and not disk_store.enabled:
+            disk_store = None
+        self.disk_store = disk_store
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.total_bytes = 0
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return the cached figure for key, or None.
+
+        Figures found in the disk store are returned as plain dictionaries,
+        which Dash serializes like figure objects.
+        """
+        with self._lock:
+            entry = self._figures.get(key)
+            if entry is not None:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+        figure_json = self.disk_store.get(key) if self.disk_store is not None else None
+        with self._lock:
+            if figure_json is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        figure = json.loads(figure_json)
+        self._add(key, figure, len(figure_json))
+        return figure
+
+    def put(self, key, figure):
+        """
+        Cache a figure. Cached figures are shared between requests and must
+        not be modified afterwards.
+        """
+        if self.max_entries <= 0 and self.disk_store is None:
+            return
+        # the JSON sent to the browser
+        figure_json = figure.to_json()
+        self._add(key, figure, len(figure_json))
+        if self.disk_store is not None:
+            self.disk_store.put(key, figure_json)
+
+    def _add(self, key, figure, size):
+        if self.max_entries <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            old_entry = self._figures.pop(key, None)
+            if old_entry is not None:
+                self.total_bytes -= old_entry[1]
+            self._figures[key] = (figure, size)
+            self.total_bytes += size
+            while (
+                len(self._figures) > self.max_entries
+                or self.total_bytes > self.max_bytes
+            ):
+                _, (_, evicted_size) = self._figures.popitem(last=False)
+                self.total_bytes -= evicted_size
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._figures),
+                "bytes": self.total_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+            }
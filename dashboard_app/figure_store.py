@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+# default size limit of the figure store shared by the workers of a node
+DEFAULT_MAX_MB = 256
+
+# default location of the figure store; every worker on the node opens the
+# same file
+DEFAULT_PATH = os.path.join(tempfile.gettempdir(), "iac_figure_cache.sqlite")
+
+# environment variables that change how the charts are built, besides the
+# filters and the data version already in the keys
+RENDER_SETTINGS = [
+    "BOXPLOT_MODE",
+    "OUTLIER_METHOD",
+    "OUTLIER_GROUPS",
+    "SKETCH_RELATIVE_ERROR",
+    "WEBGL_POINTS_THRESHOLD",
+]
+
+
+def get_render_version():
+    """
+    Identify the code and render settings the figures are built with: a hash
+    of the dashboard_app sources and the RENDER_SETTINGS environment.
+    """
+    digest = hashlib.sha1()
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    for folder, folders, files in os.walk(package_dir):
+        folders.sort()
+        for name in sorted(files):
+            if name.endswith(".py"):
+                path = os.path.join(folder, name)
+                digest.update(os.path.relpath(path, package_dir).encode())
+                with open(path, "rb") as f:
+                    digest.update(f.read())
+    for setting in RENDER_SETTINGS:
+        digest.update(f"{setting}={os.getenv(setting, '')}".encode())
+    return digest.hexdigest()[:16]
+
+
+class DiskFigureStore:
+    """
+    SQLite file of serialized figure JSON shared by all dashboard workers on a
+    node, behind the in-process FigureCache.
+
+    A figure built by one worker is served to the others from here instead of
+    being built again. Entries are keyed like the FigureCache (chart name,
+    dataset version and canonical filter state) plus the render version (see
+    get_render_version), since the file outlives the process: a restart with
+    new code or other render settings never reads figures of the old ones.
+    The least recently used entries are deleted once the stored JSON exceeds
+    max_bytes, which also removes the entries of older render versions.
+
+    Errors of the store (locked or full disk, corrupt file) are printed and
+    otherwise ignored: the figure is then simply built by the worker.
+    """
+
+    def __init__(self, path=None, max_bytes=None):
+        if path is None:
+            path = os.getenv("FIGURE_CACHE_PATH", DEFAULT_PATH)
+        if max_bytes is None:
+            max_bytes = int(
+                float(os.getenv("FIGURE_CACHE_DISK_MB", DEFAULT_MAX_MB)) * 1024**2
+            )
+        self.path = path
+        self.max_bytes = max_bytes
+        self.render_version = get_render_version()
+        # sqlite connections cannot be shared between threads or carried
+        # over a fork, so each thread of each process opens its own
+        self._local = threading.local()
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def _connect(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+        connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        # readers do not block the writer and vice versa
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS figures ("
+            "key TEXT PRIMARY KEY, figure TEXT NOT NULL, "
+            "size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS figures_last_used ON figures (last_used)"
+        )
+        self._local.connection = connection
+        self._local.pid = os.getpid()
+        return connection
+
+    def _hash_key(self, key):
+        return hashlib.sha1(
+            json.dumps([self.render_version, key]).encode()
+        ).hexdigest()
+
+    def get(self, key):
+        """Return the figure JSON stored for key, or None."""
+        if not self.enabled:
+            return None
+        try:
+            connection = self._connect()
+            hashed_key = self._hash_key(key)
+            row = connection.execute(
+                "SELECT figure FROM figures WHERE key = ?", (hashed_key,)
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                "UPDATE figures SET last_used = ? WHERE key = ?",
+                (time.time(), hashed_key),
+            )
+            return row[0]
+        except sqlite3.Error as e:
+            print(f"Figure store {self.path} unavailable: {e}")
+            return None
+
+    def put(self, key, figure_json):
+        """Store the JSON of a figure and evict the least recently used entries."""
+        size = len(figure_json)
+        if not self.enabled or size > self.max_bytes:
+            return
+        try:
+            connection = self._connect()
+            with connection:
+                connection.execute("BEGIN IMMEDIATE")
+                connection.execute(
+                    "INSERT OR REPLACE INTO figures VALUES (?, ?, ?, ?)",
+                    (self._hash_key(key), figure_json, size, time.time()),
+                )
+                total_bytes = connection.execute(
+                    "SELECT SUM(size) FROM figures"
+                ).fetchone()[0]
+                if total_bytes > self.max_bytes:
+                    self._evict(connection, total_bytes - self.max_bytes)
+        except sqlite3.Error as e:
+            print(f"Figure store {self.path} unavailable: {e}")
+
+    @staticmethod
+    def _evict(connection, excess_bytes):
+        evicted_keys = []
+        for key, size in connection.execute(
+            "SELECT key, size FROM figures ORDER BY last_used"
+        ):
+            evicted_keys.append((key,))
+            excess_bytes -= size
+            if excess_bytes <= 0:
+                break
+        connection.executemany("DELETE FROM figures WHERE key = ?", evicted_keys)
@@ -0,0 +1,202 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from dashboard_app.filter_index import FILTER_DIMENSIONS, FilterIndex
+from dashboard_app.helpers.get_filter_state import get_filter_state
+
+# number of filter states whose cell selection is kept
+DEFAULT_MAX_ENTRIES = 32
+
+# number of single-dimension selections (e.g. the cells of three states) kept
+DEFAULT_MAX_DIMENSION_ENTRIES = 128
+
+
+def get_cell_offsets(frame, n_cells):
+    """
+    Return offsets such that the rows of cell c are frame rows
+    offsets[c]:offsets[c + 1], or None if the frame is not sorted by cell.
+
+    The offsets are int32 like the cell ids: there are about as many cells
+    as rows, so they are as large as a column of every frame.
+    """
+    cell_ids = frame["cell_id"].to_numpy()
+    if len(cell_ids) > 1 and (np.diff(cell_ids) < 0).any():
+        return None
+    return np.searchsorted(cell_ids, np.arange(n_cells + 1)).astype(np.int32)
+
+
+def rows_for_cells(offsets, cells):
+    """
+    Return the sorted positions of the rows of a sorted array of cells, by
+    concatenating their runs of rows; costs O(rows + cells).
+    """
+    starts = offsets[cells]
+    lengths = offsets[cells + 1] - starts
+    # shift a running count of the output rows to the start of each run
+    run_starts = np.cumsum(lengths) - lengths
+    return np.repeat(starts - run_starts, lengths) + np.arange(lengths.sum())
+
+
+class FilterEngine:
+    """
+    Evaluates the dashboard filters once for all boxplots.
+
+    One change of a filter input triggers all eight boxplot callbacks with
+    the same filter values. The filters are evaluated over the cells (the
+    distinct combinations of the filter dimensions, see
+    data_loader.build_serving_frames) into a boolean mask, which is memoised
+    per filter state. The rows of every frame are sorted by cell (see
+    data_loader.build_serving_frames), so each callback then only gathers
+    the runs of rows of the selected cells from its own frame.
+
+    A new filter state is evaluated by the plan of FilterIndex: the cells of
+    its most selective filter, which are memoised per dimension and value,
+    narrowed down by the other filters. Users change one filter at a time,
+    so the leading selection is usually cached and only the remaining cells
+    are checked. In debug mode (DASH_DEBUG) every plan is printed.
+
+    The cell offsets of the frames are read from the serving bundle when
+    given (see data_loader.load_serving_bundle), so that memory-mapped
+    workers share them, and computed from the frames otherwise.
+    """
+
+    def __init__(
+        self,
+        cells,
+        frames,
+        cell_offsets=None,
+        max_entries=DEFAULT_MAX_ENTRIES,
+        max_dimension_entries=DEFAULT_MAX_DIMENSION_ENTRIES,
+    ):
+        self.index = FilterIndex(cells)
+        self.n_cells = len(cells)
+        self.cell_offsets = {
+            name: (
+                cell_offsets[name].to_numpy()
+                if cell_offsets is not None and name in cell_offsets
+                else get_cell_offsets(frame, self.n_cells)
+            )
+            for name, frame in frames.items()
+        }
+        self.max_entries = max_entries
+        self.max_dimension_entries = max_dimension_entries
+        self._masks = OrderedDict()
+        self._dimension_cells = OrderedDict()
+        self.debug = os.getenv("DASH_DEBUG", "true").lower() == "true"
+        # the callbacks of one interaction run concurrently in a threaded
+        # server; holding the lock while evaluating lets the first one
+        # compute the mask and the others reuse it
+        self._lock = threading.Lock()
+
+    def cell_mask(self, filter_state):
+        """
+        Return a boolean array marking the cells matching a filter state
+        (see helpers.get_filter_state).
+        """
+        return self._evaluate(filter_state)[1]
+
+    def _evaluate(self, filter_state):
+        # (sorted ids, mask) of the cells matching a filter state
+        with self._lock:
+            selection = self._masks.get(filter_state)
+            if selection is not None:
+                self._masks.move_to_end(filter_state)
+                return selection
+
+            plan = self.index.plan(dict(zip(FILTER_DIMENSIONS, filter_state)))
+            first_cells = None
+            if plan:
+                column, filter_value, code_ranges, _ = plan[0]
+                first_cells = self._cells_for_dimension(
+                    column, filter_value, code_ranges
+                )
+            cells = self.index.execute(plan, first_cells)
+            if self.debug:
+                steps = ", ".join(f"{step[0]} ({step[3]} cells)" for step in plan)
+                print(f"Filter plan: {steps or 'all cells'} -> {len(cells)} cells")
+            mask = np.zeros(self.n_cells, dtype=bool)
+            mask[cells] = True
+            self._masks[filter_state] = (cells, mask)
+            if len(self._masks) > self.max_entries:
+                self._masks.popitem(last=False)
+            return cells, mask
+
+    def _cells_for_dimension(self, column, filter_value, code_ranges):
+        # called with the lock held
+        key = (column, filter_value)
+        cells = self._dimension_cells.get(key)
+        if cells is not None:
+            self._dimension_cells.move_to_end(key)
+            return cells
+
+        cells = self.index.dimensions[column].rows_for_code_ranges(code_ranges)
+        self._dimension_cells[key] = cells
+        if len(self._dimension_cells) > self.max_dimension_entries:
+            self._dimension_cells.popitem(last=False)
+        return cells
+
+    def value_counts(self, filter_state, column, values, cell_weights):
+        """
+        Count the rows each value of a filter column would select under the
+        other filters of a filter state, e.g. for the option labels of its
+        dropdown.
+
+        Args:
+            filter_state: Normalized filter values (see helpers.get_filter_state)
+            column: Filter column of FILTER_DIMENSIONS, whose own filter is
+                ignored
+            values: Values to count, exact or wildcards like "332*"
+            cell_weights: Number of rows of every cell
+
+        Returns:
+            List of the row counts of values
+        """
+        position = FILTER_DIMENSIONS.index(column)
+        other_filters = (
+            filter_state[:position] + (None,) + filter_state[position + 1 :]
+        )
+        _, mask = self._evaluate(other_filters)
+        index = self.index.dimensions[column]
+        selected = mask & (index.codes >= 0)
+        code_counts = np.bincount(
+            index.codes[selected],
+            weights=cell_weights[selected],
+            minlength=len(index.values),
+        )
+        cumulative_counts = np.concatenate([[0], np.cumsum(code_counts)])
+
+        counts = np.zeros(len(values), dtype=np.int64)
+        # exact values are looked up together, wildcards one code range each
+        exact = [i for i, value in enumerate(values) if not str(value).endswith("*")]
+        codes = index.values.get_indexer([values[i] for i in exact])
+        for i, code in zip(exact, codes):
+            if code >= 0:
+                counts[i] = code_counts[code]
+        for i, value in enumerate(values):
+            if str(value).endswith("*"):
+                for start, stop in index.code_ranges_for_values([value]):
+                    counts[i] += cumulative_counts[stop] - cumulative_counts[start]
+        return counts.tolist()
+
+    def select(self, name, frame, naics_imputed, fy_range, impstatus, arc2, state):
+        """
+        Return the sorted positions of the rows of the boxplot frame `name`
+        matching the dashboard filters.
+
+        Empty filters are ignored, as in the chart callbacks.
+        """
+        filter_state = get_filter_state(
+            naics_imputed, fy_range, impstatus, arc2, state
+        )
+        if all(value is None for value in filter_state):
+            return np.arange(len(frame))
+
+        cells, mask = self._evaluate(filter_state)
+        offsets = self.cell_offsets.get(name)
+        if offsets is None:
+            # rows in any order: scan the cell ids of the whole frame
+            return np.flatnonzero(mask[frame["cell_id"].to_numpy()])
+        return rows_for_cells(offsets, cells)
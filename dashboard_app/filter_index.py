@@ -0,0 +1,196 @@
+import numpy as np
+import pandas as pd
+from dashboard_app.helpers.get_prefix_range import get_prefix_range
+
+# frame columns filtered by the dashboard's sector, year, status, ARC and state inputs
+FILTER_DIMENSIONS = ["naics_imputed", "fy", "impstatus", "arc2", "state"]
+
+
+class DimensionIndex:
+    """
+    Inverted index of one filter column.
+
+    The distinct values are sorted and numbered (codes): numerically for
+    numbers, lexicographically by their string form otherwise. row_ids lists
+    the row positions grouped by code, and offsets[c]:offsets[c + 1] is the
+    slice of row_ids holding the rows with code c, in ascending row order.
+    Because string codes follow the sort order of the labels, the values
+    matching a wildcard like "332*" are one contiguous run of codes, and
+    their rows one contiguous slice of row_ids.
+    Rows with a missing value are not indexed and never match a filter.
+    """
+
+    def __init__(self, series):
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes = series.cat.codes.to_numpy()
+            values = series.cat.categories
+        else:
+            codes, values = pd.factorize(series, sort=True)
+            values = pd.Index(values)
+
+        # string form of the values, used to match wildcard patterns
+        labels = np.asarray(values.astype(str))
+        self.sorted_labels = not pd.api.types.is_numeric_dtype(values.dtype)
+        if self.sorted_labels:
+            # renumber the codes in the lexicographic order of the labels
+            order = np.argsort(labels, kind="stable")
+            rank = np.empty(len(order), dtype=codes.dtype)
+            rank[order] = np.arange(len(order))
+            codes = np.where(codes >= 0, rank[codes], -1)
+            values = values[order]
+            labels = labels[order]
+        self.values = values
+        self.labels = labels
+
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.values))
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+        order = np.argsort(codes, kind="stable")
+        # missing values (code -1) sort first; drop them
+        self.row_ids = order[len(codes) - self.offsets[-1] :].astype(np.int32)
+        # code of every row, to filter rows already selected by another column
+        self.codes = codes.astype(np.int32)
+
+    def count_for_code_ranges(self, code_ranges):
+        """Return the number of rows whose code is in one of the ranges."""
+        return int(
+            sum(
+                self.offsets[stop] - self.offsets[start]
+                for start, stop in code_ranges
+                if stop > start
+            )
+        )
+
+    def rows_for_code_ranges(self, code_ranges):
+        """
+        Return the sorted row ids of all rows whose code is in one of the
+        (start, stop) ranges; the ranges must not overlap.
+        """
+        slices = [
+            self.row_ids[self.offsets[start] : self.offsets[stop]]
+            for start, stop in code_ranges
+            if stop > start
+        ]
+        if not slices:
+            return self.row_ids[:0]
+        if len(slices) == 1 and code_ranges[0][1] - code_ranges[0][0] == 1:
+            return slices[0]
+        # rows are only sorted within each code, so sort the union
+        return np.sort(np.concatenate(slices))
+
+    def filter_rows(self, rows, code_ranges):
+        """
+        Keep the rows of a sorted selection whose code is in one of the
+        ranges; costs O(len(rows)) whatever the ranges match.
+        """
+        # one flag per code, and a last one for missing values (code -1)
+        matches = np.zeros(len(self.values) + 1, dtype=bool)
+        for start, stop in code_ranges:
+            matches[start:stop] = True
+        return rows[matches[self.codes[rows]]]
+
+    def code_ranges_for_values(self, filter_values):
+        """
+        Map filter values to non-overlapping (start, stop) code ranges; values
+        can be exact or wildcards like "332*".
+        """
+        ranges = []
+        exact_values = []
+        for value in filter_values:
+            if str(value).endswith("*"):
+                prefix = str(value)[:-1]
+                if self.sorted_labels:
+                    ranges.append(get_prefix_range(self.labels, prefix))
+                else:
+                    matches = np.char.startswith(self.labels, prefix)
+                    ranges.extend(
+                        (code, code + 1) for code in np.flatnonzero(matches)
+                    )
+            else:
+                exact_values.append(value)
+
+        if exact_values:
+            positions = self.values.get_indexer(exact_values)
+            ranges.extend((code, code + 1) for code in positions[positions >= 0])
+
+        # merge overlapping ranges, e.g. "33*" with "332*" or an exact "332710"
+        merged = []
+        for start, stop in sorted(ranges):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], stop))
+            else:
+                merged.append((start, stop))
+        return merged
+
+    def code_range_for_interval(self, low, high):
+        # values are sorted, so a closed interval is one contiguous run of codes
+        start = np.searchsorted(self.values, low, side="left")
+        stop = np.searchsorted(self.values, high, side="right")
+        return [(start, stop)]
+
+
+class FilterIndex:
+    """
+    Inverted index over the filter dimensions of one boxplot frame.
+
+    A filter is evaluated by a small query plan: the number of rows each
+    filter matches is read off the per-value counts of its index, the most
+    selective filter is evaluated as a union of row-id slices, and the
+    others only check the codes of the rows that remain, instead of boolean
+    scans over the whole frame.
+    """
+
+    def __init__(self, df):
+        self.n_rows = len(df)
+        self.dimensions = {
+            column: DimensionIndex(df[column]) for column in FILTER_DIMENSIONS
+        }
+
+    def code_ranges_for_dimension(self, column, filter_value):
+        index = self.dimensions[column]
+        if column == "fy":
+            min_year, max_year = filter_value
+            return index.code_range_for_interval(min_year, max_year)
+        return index.code_ranges_for_values(filter_value)
+
+    def plan(self, filters):
+        """
+        Order the filters by the number of rows they match.
+
+        Args:
+            filters: Dict of the filter value of each column of
+                FILTER_DIMENSIONS; empty filters are ignored
+
+        Returns:
+            List of (column, filter value, code ranges, matching rows) steps,
+            most selective first
+        """
+        steps = []
+        for column, filter_value in filters.items():
+            if not filter_value:
+                continue
+            code_ranges = self.code_ranges_for_dimension(column, filter_value)
+            n_rows = self.dimensions[column].count_for_code_ranges(code_ranges)
+            steps.append((column, filter_value, code_ranges, n_rows))
+        steps.sort(key=lambda step: step[3])
+        return steps
+
+    def execute(self, plan, first_rows=None):
+        """
+        Return the sorted positions of the rows matching all steps of a plan.
+
+        Args:
+            plan: Steps returned by plan()
+            first_rows: Rows matching the first step, if already known
+        """
+        if not plan:
+            return np.arange(self.n_rows)
+
+        column, _, code_ranges, _ = plan[0]
+        rows = first_rows
+        if rows is None:
+            rows = self.dimensions[column].rows_for_code_ranges(code_ranges)
+        for column, _, code_ranges, _ in plan[1:]:
+            if len(rows) == 0:
+                break
+            rows = self.dimensions[column].filter_rows(rows, code_ranges)
+        return rows
@@ -0,0 +1,19 @@
+import pandas as pd
+
+
+def gather_rows(df, rows, columns):
+    """
+    Build the DataFrame handed to a chart from a row selection.
+
+    Only the listed columns are gathered, so the other columns of the frame
+    are never copied.
+
+    Args:
+        df: DataFrame the row positions refer to
+        rows: Integer positions of the selected rows
+        columns: Columns used by the chart
+
+    Returns:
+        DataFrame with the selected rows of the listed columns
+    """
+    return pd.DataFrame({column: df[column].take(rows) for column in columns})
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+
+
+def get_box_statistics(df, value_column, group_columns):
+    """
+    Compute the boxplot statistics of every group of a DataFrame.
+
+    The statistics are those plotly.js computes from raw data: quartiles
+    interpolated as in its default "linear" quartile method, whiskers at the
+    most extreme values within 1.5 IQR of the box, and the values beyond the
+    whiskers as outliers. All groups are computed together on one sort of
+    the values instead of one pass per group.
+
+    Args:
+        df: DataFrame with the value and group columns
+        value_column: Column to summarize; missing values are ignored
+        group_columns: Columns defining the groups, e.g. ["impstatus", "arc2"]
+
+    Returns:
+        DataFrame with one row per group, in order of first appearance, with
+        the group columns and count, q1, median, q3, lowerfence, upperfence
+        and outliers (array of the values beyond the whiskers), in the float
+        dtype of the value column
+    """
+    dtype = df[value_column].dtype
+    if not np.issubdtype(dtype, np.floating):
+        dtype = np.float64
+    values = df[value_column].to_numpy(dtype=np.float64, na_value=np.nan)
+    present = ~np.isnan(values)
+
+    # number the groups from the codes of the group columns, which is much
+    # faster than hashing tuples of labels
+    combined_codes = np.zeros(len(df), dtype=np.int64)
+    column_uniques = []
+    for column in group_columns:
+        codes, uniques = pd.factorize(df[column])
+        present &= codes >= 0
+        combined_codes = combined_codes * len(uniques) + codes
+        column_uniques.append(uniques)
+    group_ids, group_codes = pd.factorize(combined_codes[present])
+    values = values[present]
+    if len(values) == 0:
+        return pd.DataFrame(
+            columns=list(group_columns)
+            + ["count", "q1", "median", "q3", "lowerfence", "upperfence", "outliers"]
+        )
+
+    # sort by group, and by value within each group
+    order = np.lexsort((values, group_ids))
+    values = values[order]
+    group_ids = group_ids[order]
+
+    counts = np.bincount(group_ids, minlength=len(group_codes))
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+    def quantile(q):
+        # same interpolation as Lib.interp in plotly.js
+        position = np.clip(q * counts - 0.5, 0, counts - 1)
+        low = np.floor(position)
+        fraction = position - low
+        low = starts + low.astype(np.int64)
+        high = np.minimum(low + 1, starts + counts - 1)
+        return values[low] + (values[high] - values[low]) * fraction
+
+    q1 = quantile(0.25)
+    median = quantile(0.5)
+    q3 = quantile(0.75)
+    iqr = q3 - q1
+
+    # whiskers end at the most extreme values within 1.5 IQR of the box
+    inside = (values >= (q1 - 1.5 * iqr)[group_ids]) & (
+        values <= (q3 + 1.5 * iqr)[group_ids]
+    )
+    lowerfence = np.fmin(
+        q1, np.fmin.reduceat(np.where(inside, values, np.inf), starts)
+    )
+    upperfence = np.fmax(
+        q3, np.fmax.reduceat(np.where(inside, values, -np.inf), starts)
+    )
+
+    outlier_rows = np.flatnonzero(~inside)
+    outlier_groups = np.searchsorted(
+        outlier_rows, np.concatenate([starts, [len(values)]])
+    )
+    outliers = [
+        values[outlier_rows[outlier_groups[i] : outlier_groups[i + 1]]].astype(dtype)
+        for i in range(len(group_codes))
+    ]
+
+    # split the combined codes back into the labels of each group column
+    group_labels = {}
+    remaining_codes = group_codes
+    for column, uniques in zip(group_columns[::-1], column_uniques[::-1]):
+        group_labels[column] = np.asarray(uniques)[remaining_codes % len(uniques)]
+        remaining_codes = remaining_codes // len(uniques)
+
+    statistics = pd.DataFrame(
+        {column: group_labels[column] for column in group_columns}
+    )
+    statistics["count"] = counts
+    statistics["q1"] = q1.astype(dtype)
+    statistics["median"] = median.astype(dtype)
+    statistics["q3"] = q3.astype(dtype)
+    statistics["lowerfence"] = lowerfence.astype(dtype)
+    statistics["upperfence"] = upperfence.astype(dtype)
+    statistics["outliers"] = outliers
+    return statistics
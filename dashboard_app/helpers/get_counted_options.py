@@ -0,0 +1,24 @@
+def get_counted_options(options, counts, selected=None):
+    """
+    Add row counts to the labels of dropdown options, e.g. "CA (1,204)".
+
+    Options without rows are disabled unless they are selected, so that a
+    selection that no longer matches can still be removed.
+
+    Args:
+        options: Dropdown options ({"label", "value"} dictionaries)
+        counts: Row count of every option
+        selected: Currently selected values
+
+    Returns:
+        New list of options
+    """
+    selected = set(selected or [])
+    return [
+        {
+            "label": f"{option['label']} ({count:,})",
+            "value": option["value"],
+            "disabled": count == 0 and option["value"] not in selected,
+        }
+        for option, count in zip(options, counts)
+    ]
@@ -0,0 +1,63 @@
+import pandas as pd
+from dashboard_app.helpers.get_wildcard_patterns import get_wildcard_patterns
+
+
+def get_filter_options(df):
+    """
+    Compute the dropdown options and slider bounds of the dashboard filters.
+
+    Args:
+        df: DataFrame with the filter panel columns (see data_loader.FILTER_COLUMNS)
+
+    Returns:
+        JSON-serializable dictionary consumed by components.filters.create_filters
+    """
+    # Get unique values for each filter
+    unique_states = sorted(df["state"].dropna().unique())
+    unique_arc_codes = sorted(df["arc2"].dropna().unique())
+    unique_naics_codes = sorted(df["naics_imputed"].dropna().unique())
+
+    # Generate wildcard options
+    arc_wildcards = get_wildcard_patterns(unique_arc_codes, "arc", df)
+    naics_wildcards = get_wildcard_patterns(unique_naics_codes, "naics")
+
+    naics_options = [
+        {
+            "label": f"{row['naics_imputed']} - {row['naics_description']}",
+            "value": row["naics_imputed"],
+        }
+        for _, row in (
+            df[["naics_imputed", "naics_description"]]
+            .dropna()
+            .drop_duplicates()
+            .sort_values("naics_imputed")
+            .iterrows()
+        )
+    ]
+    arc_options = [
+        {
+            "label": f"{row['arc2']} - {row['specific_description']}",
+            "value": row["arc2"],
+        }
+        for _, row in (
+            df[["arc2", "specific_description"]]
+            .dropna()
+            .drop_duplicates()
+            .sort_values("arc2")
+            .iterrows()
+        )
+    ]
+    state_options = [{"label": str(val), "value": val} for val in unique_states]
+
+    reference_year = df["reference_year"].max()
+
+    return {
+        "fy_min": int(df["fy"].min()),
+        "fy_max": int(df["fy"].max()),
+        "reference_year": None if pd.isna(reference_year) else int(reference_year),
+        "naics_wildcards": naics_wildcards,
+        "naics_options": naics_options,
+        "arc_wildcards": arc_wildcards,
+        "arc_options": arc_options,
+        "state_options": state_options,
+    }
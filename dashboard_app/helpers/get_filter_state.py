@@ -0,0 +1,42 @@
+def get_filter_state(naics_imputed, fy_range, impstatus, arc2, state):
+    """
+    Normalize the values of the dashboard filters into a hashable key.
+
+    Selections that match the same rows map to the same key: the order of
+    the selected dropdown values and repeated values are ignored, values
+    covered by a selected wildcard (e.g. "3323*" or "332710" next to "332*")
+    are dropped, and an empty selection (no filter) is None.
+
+    Args:
+        naics_imputed: Selected NAICS codes (can include wildcards like "311*")
+        fy_range: [min_year, max_year] from the year slider
+        impstatus: Selected implementation statuses
+        arc2: Selected ARC codes (can include wildcards like "2.4*")
+        state: Selected states
+
+    Returns:
+        Tuple (naics_imputed, fy_range, impstatus, arc2, state) of tuples or None
+    """
+
+    def normalize(values):
+        if not values:
+            return None
+        values = set(values)
+        prefixes = [str(value)[:-1] for value in values if str(value).endswith("*")]
+        values = [
+            value
+            for value in values
+            if not any(
+                str(value).startswith(prefix) and str(value) != prefix + "*"
+                for prefix in prefixes
+            )
+        ]
+        return tuple(sorted(values, key=str))
+
+    return (
+        normalize(naics_imputed),
+        tuple(int(year) for year in fy_range) if fy_range else None,
+        normalize(impstatus),
+        normalize(arc2),
+        normalize(state),
+    )
@@ -0,0 +1,24 @@
+import numpy as np
+
+
+def get_prefix_range(sorted_labels, prefix):
+    """
+    Find the labels starting with a prefix in a lexicographically sorted array.
+
+    Args:
+        sorted_labels: Sorted numpy array of strings (e.g. distinct NAICS codes)
+        prefix: Prefix to look up, e.g. "332" for the wildcard "332*"
+
+    Returns:
+        (start, stop) such that sorted_labels[start:stop] are exactly the
+        labels starting with the prefix
+    """
+    if not prefix:
+        return 0, len(sorted_labels)
+
+    # every label starting with the prefix sorts at or after the prefix itself
+    # and before the prefix with its last character incremented
+    upper_bound = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    start = np.searchsorted(sorted_labels, prefix, side="left")
+    stop = np.searchsorted(sorted_labels, upper_bound, side="left")
+    return int(start), int(stop)
@@ -0,0 +1,190 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from dashboard_app.charts.box_statistics import get_boxplot_mode
+
+# "sigma" keeps values within threshold standard deviations of the mean,
+# "iqr" within threshold interquartile ranges of the quartiles and "mad"
+# within threshold scaled median absolute deviations of the median
+DEFAULT_OUTLIER_METHOD = "sigma"
+OUTLIER_METHODS = ("sigma", "iqr", "mad")
+
+# columns defining the groups whose statistics are computed separately
+DEFAULT_OUTLIER_GROUPS = "none"
+OUTLIER_GROUPS = {
+    "none": [],
+    "arc2": ["arc2"],
+    "arc2_impstatus": ["arc2", "impstatus"],
+}
+
+# unit of the outlier slider's threshold for each method
+THRESHOLD_UNITS = {"sigma": "σ", "iqr": " IQR", "mad": " MAD"}
+
+# MAD of normally distributed data times this is its standard deviation, so
+# the thresholds of "mad" and "sigma" are comparable
+MAD_SCALE = 1.4826
+
+# number of row selections kept with their values, groups and outlier
+# bounds, e.g. the eight charts of four filter combinations
+DEFAULT_MAX_ENTRIES = 32
+
+
+def get_outlier_method():
+    method = os.getenv("OUTLIER_METHOD", DEFAULT_OUTLIER_METHOD).lower()
+    if method not in OUTLIER_METHODS:
+        raise ValueError(f"Unknown OUTLIER_METHOD: {method}")
+    return method
+
+
+def get_outlier_groups():
+    groups = os.getenv("OUTLIER_GROUPS", DEFAULT_OUTLIER_GROUPS).lower()
+    if groups not in OUTLIER_GROUPS:
+        raise ValueError(f"Unknown OUTLIER_GROUPS: {groups}")
+    return OUTLIER_GROUPS[groups]
+
+
+def get_threshold_unit():
+    """Unit of the outlier slider; BOXPLOT_MODE=sketch always uses sigma."""
+    if get_boxplot_mode() == "sketch":
+        return THRESHOLD_UNITS["sigma"]
+    return THRESHOLD_UNITS[get_outlier_method()]
+
+
+def get_group_ids(df, rows, group_columns):
+    """
+    Number the groups of the selected rows; missing labels form a group.
+    Without group columns, all rows are one group and None is returned.
+    """
+    if not group_columns:
+        return None
+    group_ids = np.zeros(len(rows), dtype=np.int64)
+    for column in group_columns:
+        codes, uniques = pd.factorize(df[column].take(rows), use_na_sentinel=False)
+        group_ids = group_ids * len(uniques) + codes
+    return pd.factorize(group_ids)[0]
+
+
+def get_outlier_bounds(values, group_ids, method):
+    """
+    Compute the per-group statistics of an outlier rule.
+
+    Each statistic is one group-by aggregation over the integer group ids.
+
+    Args:
+        values: Series of the values
+        group_ids: Integer group of every value, numbered from 0, or None
+            for a single group
+        method: One of OUTLIER_METHODS
+
+    Returns:
+        (low, high, scale) arrays indexed by group id: a value is kept with
+        a threshold t if low - t * scale <= value <= high + t * scale
+    """
+    if group_ids is None:
+        # one group: aggregate the Series directly rather than grouping
+        group_ids = np.zeros(len(values), dtype=np.int64)
+        grouped = values
+    else:
+        grouped = values.groupby(group_ids, sort=True)
+    if method == "sigma":
+        mean = np.atleast_1d(grouped.mean()).astype(np.float64)
+        std = np.atleast_1d(grouped.std()).astype(np.float64)
+        # the sample std of a group with a single value is NaN: keep the value,
+        # which equals the group mean, rather than dropping the group
+        std[np.isnan(std)] = 0.0
+        return mean, mean, std
+    if method == "iqr":
+        q1 = np.atleast_1d(grouped.quantile(0.25)).astype(np.float64)
+        q3 = np.atleast_1d(grouped.quantile(0.75)).astype(np.float64)
+        return q1, q3, q3 - q1
+    median = np.atleast_1d(grouped.median()).astype(np.float64)
+    deviations = (values - median[group_ids]).abs()
+    if grouped is not values:
+        deviations = deviations.groupby(group_ids, sort=True)
+    mad = np.atleast_1d(deviations.median()).astype(np.float64)
+    return median, median, MAD_SCALE * mad
+
+
+class OutlierFilter:
+    """
+    Removes outliers from the row selections of the boxplot callbacks.
+
+    The rule (OUTLIER_METHOD) is applied over the whole selection or
+    separately within each ARC code or ARC code and status (OUTLIER_GROUPS),
+    so that boxes of very different magnitudes are each trimmed by their own
+    spread.
+
+    Only the outlier slider changes while it is dragged, so each selection
+    is cached with its values, groups and group statistics, keyed by the
+    other filters. Moving the slider then neither evaluates the filters nor
+    gathers the values nor computes statistics again: the cached values are
+    only compared to the bounds of the new threshold.
+    """
+
+    def __init__(self, method=None, group_columns=None, max_entries=None):
+        if method is None:
+            method = get_outlier_method()
+        if group_columns is None:
+            group_columns = get_outlier_groups()
+        if max_entries is None:
+            max_entries = DEFAULT_MAX_ENTRIES
+        self.method = method
+        self.group_columns = group_columns
+        self.max_entries = max_entries
+        self._selections = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _prepare(self, df, rows, column_name):
+        values = df[column_name].take(rows)
+        group_ids = get_group_ids(df, rows, self.group_columns)
+        bounds = get_outlier_bounds(values, group_ids, self.method)
+        if group_ids is None:
+            # one group: compare with scalar bounds
+            bounds = tuple(bound[0] for bound in bounds)
+        else:
+            group_ids = group_ids.astype(np.int32)
+        return rows, values.to_numpy(), group_ids, bounds
+
+    def filter_rows(self, key, df, column_name, threshold, select_rows):
+        """
+        Select rows and drop the outliers among them.
+
+        Args:
+            key: Hashable identity of the selection, e.g. the frame name and
+                filter state, under which it is cached
+            df: DataFrame the row positions refer to
+            column_name: Column to look for outliers in; a column missing
+                from df leaves the selection unchanged
+            threshold: Multiple of the spread to keep (e.g. standard
+                deviations for "sigma")
+            select_rows: Function returning the sorted positions of the
+                selected rows, called when the selection is not cached
+
+        Returns:
+            The sorted positions of the selected rows that are not outliers
+        """
+        if column_name not in df.columns:
+            return select_rows()
+
+        key = (key, column_name)
+        with self._lock:
+            selection = self._selections.get(key)
+            if selection is not None:
+                self._selections.move_to_end(key)
+        if selection is None:
+            selection = self._prepare(df, select_rows(), column_name)
+            with self._lock:
+                self._selections[key] = selection
+                if len(self._selections) > self.max_entries:
+                    self._selections.popitem(last=False)
+
+        rows, values, group_ids, (low, high, scale) = selection
+        if group_ids is not None:
+            low, high, scale = low[group_ids], high[group_ids], scale[group_ids]
+        keep = (values >= low - threshold * scale) & (
+            values <= high + threshold * scale
+        )
+        return rows[keep]
@@ -9,7 +9,7 @@ from pathlib import Path
 # from dashboard_app.charts import create_boxplot_cost_chart
 
 
-def create_dashboard_page(filters_df, reference_year):
+def create_dashboard_page(filter_options, reference_year):
     # Read metadata for last updated
     try:
         metadata_path = Path("data/final/iac_metadata.json")
@@ -32,7 +32,7 @@ def create_dashboard_page(filters_df, reference_year):
             # Filters row
             dbc.Row(
                 [
-                    create_filters(filters_df),
+                    create_filters(filter_options),
                 ]
             ),
             # # Last updated row
@@ -0,0 +1,212 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# default relative error of the quantiles read from the sketches
+DEFAULT_RELATIVE_ERROR = 0.01
+
+# offset keeping the bucket numbers of positive values above 0 (zero) and
+# those of negative values below it, for any float32 magnitude at the
+# smallest supported relative error (0.0001)
+BUCKET_OFFSET = 2**20
+
+# bucket numbers shifted by this are non-negative and below 2 * this
+BUCKET_RANGE = 2 * BUCKET_OFFSET
+
+STATISTICS_COLUMNS = [
+    "count",
+    "q1",
+    "median",
+    "q3",
+    "lowerfence",
+    "upperfence",
+    "outliers",
+]
+
+
+def combine_keys(ids, buckets):
+    """Pack (id, bucket) pairs into int64 keys sorting by id, then bucket."""
+    return ids.astype(np.int64) * (2 * BUCKET_RANGE) + (buckets + BUCKET_RANGE)
+
+
+def split_keys(keys):
+    return keys // (2 * BUCKET_RANGE), keys % (2 * BUCKET_RANGE) - BUCKET_RANGE
+
+
+def get_cell_boxes(cells):
+    """
+    Map the filter cells to the boxes of the boxplots.
+
+    Every cell belongs to exactly one box, its (impstatus, arc2) pair; cells
+    with a missing impstatus or arc2 belong to none, as their rows are not
+    drawn.
+
+    Returns:
+        (cell_boxes, box_keys): the box number of every cell (-1 for none),
+        and a DataFrame with the impstatus and arc2 of every box number
+    """
+    impstatus_codes, impstatus = pd.factorize(cells["impstatus"])
+    arc2_codes, arc2 = pd.factorize(cells["arc2"])
+    valid = (impstatus_codes >= 0) & (arc2_codes >= 0)
+    box_codes = impstatus_codes.astype(np.int64) * len(arc2) + arc2_codes
+    cell_boxes = np.full(len(cells), -1, dtype=np.int64)
+    cell_boxes[valid], box_codes = pd.factorize(box_codes[valid])
+    box_keys = pd.DataFrame(
+        {
+            "impstatus": np.asarray(impstatus)[box_codes // len(arc2)],
+            "arc2": np.asarray(arc2)[box_codes % len(arc2)],
+        }
+    )
+    return cell_boxes, box_keys
+
+
+class CellSketches:
+    """
+    Mergeable quantile sketches of one boxplot value for every filter cell.
+
+    Each value is counted in a logarithmic bucket, as in DDSketch: bucket k
+    of the positive values covers (gamma^(k-1), gamma^k] with
+    gamma = (1 + e) / (1 - e), so every value in it is within the relative
+    error e of the bucket's representative value. Negative values use the
+    mirrored buckets and zero a bucket of its own. Sketches merge by adding
+    bucket counts, so the boxes of any filter combination are read from the
+    sketches of the matching cells, at a cost that depends on the number of
+    non-empty (cell, bucket) pairs instead of the number of rows.
+
+    The sigma outlier filter of the callbacks is applied to the merged
+    sketches too (at bucket precision), with the mean and standard deviation
+    rolled up from the cube (see cube.Cube).
+    """
+
+    def __init__(self, frame, value_column, cell_boxes, box_keys, relative_error=None):
+        if relative_error is None:
+            relative_error = float(
+                os.getenv("SKETCH_RELATIVE_ERROR", DEFAULT_RELATIVE_ERROR)
+            )
+        if not 0.0001 <= relative_error < 1:
+            raise ValueError(f"Unsupported SKETCH_RELATIVE_ERROR: {relative_error}")
+        self.value_column = value_column
+        self.gamma = (1 + relative_error) / (1 - relative_error)
+        self.log_gamma = np.log(self.gamma)
+
+        values = frame[value_column].to_numpy(dtype=np.float64, na_value=np.nan)
+        cell_ids = frame["cell_id"].to_numpy()
+        present = ~np.isnan(values)
+        values = values[present]
+        cell_ids = cell_ids[present]
+
+        # one entry per non-empty (cell, bucket), sorted by cell and bucket
+        entries, counts = np.unique(
+            combine_keys(cell_ids, self.bucket_of(values)), return_counts=True
+        )
+        entry_cells, entry_buckets = split_keys(entries)
+        self.entry_cells = entry_cells.astype(np.int32)
+        self.entry_buckets = entry_buckets.astype(np.int32)
+        self.entry_counts = counts.astype(np.int32)
+
+        # every cell belongs to exactly one box (see get_cell_boxes)
+        self.cell_boxes = cell_boxes
+        self.box_keys = box_keys
+
+    def bucket_of(self, values):
+        """Bucket numbers, increasing with the values; 0 for zero."""
+        magnitude = np.abs(values)
+        buckets = np.zeros(len(values), dtype=np.int64)
+        nonzero = magnitude > 0
+        buckets[nonzero] = (
+            np.ceil(np.log(magnitude[nonzero]) / self.log_gamma).astype(np.int64)
+            + BUCKET_OFFSET
+        )
+        return np.where(values < 0, -buckets, buckets)
+
+    def value_of(self, buckets):
+        """Representative value of buckets (inverse of bucket_of)."""
+        magnitude = np.abs(buckets) - BUCKET_OFFSET
+        values = 2 * self.gamma**magnitude / (self.gamma + 1)
+        values = np.where(buckets < 0, -values, values)
+        return np.where(buckets == 0, 0.0, values)
+
+    def box_statistics(self, cell_mask, value_range=None):
+        """
+        Boxplot statistics of the selected cells, per (impstatus, arc2) box.
+
+        Args:
+            cell_mask: Boolean array marking the selected cells
+            value_range: (low, high) bounds of the values to keep, from the
+                outlier filter (None: all)
+
+        Returns:
+            DataFrame in the format of helpers.get_box_statistics, with one
+            outlier point per non-empty bucket beyond the whiskers
+        """
+        selected = cell_mask[self.entry_cells] & (
+            self.cell_boxes[self.entry_cells] >= 0
+        )
+        buckets = self.entry_buckets[selected]
+        counts = self.entry_counts[selected]
+        boxes = self.cell_boxes[self.entry_cells[selected]]
+
+        if value_range is not None:
+            low, high = value_range
+            bucket_values = self.value_of(buckets)
+            keep = (bucket_values >= low) & (bucket_values <= high)
+            buckets, counts, boxes = buckets[keep], counts[keep], boxes[keep]
+
+        if len(counts) == 0:
+            return pd.DataFrame(columns=["impstatus", "arc2"] + STATISTICS_COLUMNS)
+
+        # merge the sketches of each box: add up the counts per bucket
+        merged, inverse = np.unique(combine_keys(boxes, buckets), return_inverse=True)
+        counts = np.bincount(inverse, weights=counts).astype(np.int64)
+        boxes, buckets = split_keys(merged)
+        values = self.value_of(buckets)
+
+        box_ids, starts = np.unique(boxes, return_index=True)
+        box_counts = np.add.reduceat(counts, starts)
+        cumulative = np.cumsum(counts)
+        offsets = cumulative[starts] - counts[starts]
+        ends = np.append(starts[1:], len(counts))
+
+        def value_at(rank):
+            # value of the bucket holding the sorted position rank of each box
+            return values[np.searchsorted(cumulative, offsets + rank, side="right")]
+
+        def quantile(q):
+            # same interpolation as get_box_statistics (Lib.interp in
+            # plotly.js), between the buckets of two neighbouring positions
+            position = np.clip(q * box_counts - 0.5, 0, box_counts - 1)
+            low = np.floor(position)
+            high = np.minimum(low + 1, box_counts - 1)
+            low_values = value_at(low)
+            return low_values + (value_at(high) - low_values) * (position - low)
+
+        q1 = quantile(0.25)
+        median = quantile(0.5)
+        q3 = quantile(0.75)
+        iqr = q3 - q1
+
+        box_of_bucket = np.repeat(np.arange(len(box_ids)), ends - starts)
+        inside = (values >= (q1 - 1.5 * iqr)[box_of_bucket]) & (
+            values <= (q3 + 1.5 * iqr)[box_of_bucket]
+        )
+        lowerfence = np.fmin(
+            q1, np.fmin.reduceat(np.where(inside, values, np.inf), starts)
+        )
+        upperfence = np.fmax(
+            q3, np.fmax.reduceat(np.where(inside, values, -np.inf), starts)
+        )
+        outliers = [
+            values[start:end][~inside[start:end]].astype(np.float32)
+            for start, end in zip(starts, ends)
+        ]
+
+        statistics = self.box_keys.iloc[box_ids].reset_index(drop=True)
+        statistics["count"] = box_counts
+        statistics["q1"] = q1.astype(np.float32)
+        statistics["median"] = median.astype(np.float32)
+        statistics["q3"] = q3.astype(np.float32)
+        statistics["lowerfence"] = lowerfence.astype(np.float32)
+        statistics["upperfence"] = upperfence.astype(np.float32)
+        statistics["outliers"] = outliers
+        return statistics
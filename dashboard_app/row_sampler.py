@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+# most points drawn per boxplot in points mode
+MAX_SAMPLE_POINTS = 10000
+
+# points every (impstatus, arc2) box keeps in a sample, if it has them
+MIN_BOX_POINTS = 50
+
+# seed of the sampling ranks, the same in every worker
+SAMPLE_SEED = 42
+
+
+def get_sampling_order(frame, cell_boxes, seed=SAMPLE_SEED):
+    """
+    Rank the rows of a frame for RowSampler.
+
+    Written to the serving bundle (see data_loader.write_serving_bundle), so
+    that workers memory-map the ranks instead of each computing its own copy.
+
+    Args:
+        frame: Boxplot frame with a cell_id column
+        cell_boxes: Box number of every cell (see quantile_sketch.get_cell_boxes)
+        seed: Seed of the random ranks
+
+    Returns:
+        DataFrame with the random rank of every row ("rank"), all rows
+        ordered by stratum, then rank ("order"), and the stratum number of
+        every position of that order ("order_stratum"), as int32
+    """
+    rng = np.random.default_rng(seed)
+    ranks = rng.permutation(len(frame)).astype(np.int32)
+    strata = cell_boxes[frame["cell_id"].to_numpy()]
+    order = np.lexsort((ranks, strata))
+    sorted_strata = strata[order]
+    order_strata = np.cumsum(np.r_[True, sorted_strata[1:] != sorted_strata[:-1]]) - 1
+    return pd.DataFrame(
+        {
+            "rank": ranks,
+            "order": order.astype(np.int32),
+            "order_stratum": order_strata.astype(np.int32),
+        }
+    )
+
+
+class RowSampler:
+    """
+    Deterministic, stratified samples of the row selections of one frame.
+
+    Every row gets a fixed random rank when the dataset is built. The sample
+    of a selection is then its rows of lowest rank, so it needs no random
+    draw, is the same on every request and in every worker, and changes
+    little when the selection changes a little. Each stratum (the boxes of
+    the boxplot, see quantile_sketch.get_cell_boxes) keeps at least
+    min_points rows, so that small groups do not vanish from the chart.
+    """
+
+    def __init__(self, sampling_order):
+        # all rows ordered by stratum, then rank, once (see
+        # get_sampling_order): a sample then only needs passes over the rows
+        # in this order, no sort
+        self.ranks = sampling_order["rank"].to_numpy()
+        self.order = sampling_order["order"].to_numpy()
+        self.order_strata = sampling_order["order_stratum"].to_numpy()
+        self.stratum_starts = np.flatnonzero(
+            np.r_[True, self.order_strata[1:] != self.order_strata[:-1]]
+        )
+
+    def sample(self, rows, max_points=MAX_SAMPLE_POINTS, min_points=MIN_BOX_POINTS):
+        """
+        Sample a row selection.
+
+        Args:
+            rows: Sorted integer positions of the selected rows
+            max_points: Size of the sample
+            min_points: Rows kept in every stratum; lowered when the strata
+                would not fit in max_points otherwise
+
+        Returns:
+            Sorted positions of the sampled rows (rows itself if it has at
+            most max_points rows)
+        """
+        if len(rows) <= max_points:
+            return rows
+        selected = np.zeros(len(self.order), dtype=bool)
+        selected[rows] = True
+        selected = selected[self.order]
+
+        # place of every selected row among the selected rows of its stratum,
+        # by rank, from a running count of the selected rows
+        running_count = np.cumsum(selected)
+        counts_before = (running_count - selected)[self.stratum_starts]
+        places = running_count - 1 - counts_before[self.order_strata]
+        n_strata = np.count_nonzero(
+            np.add.reduceat(selected, self.stratum_starts) > 0
+        )
+        min_points = min(min_points, max_points // n_strata)
+        reserved = selected & (places < min_points)
+
+        # fill the rest of the sample with the lowest ranks of all strata
+        remaining = max_points - np.count_nonzero(reserved)
+        others = self.order[selected & ~reserved]
+        if remaining < len(others):
+            others = others[
+                np.argpartition(self.ranks[others], remaining)[:remaining]
+            ]
+        sampled = np.zeros(len(self.order), dtype=bool)
+        sampled[self.order[reserved]] = True
+        sampled[others] = True
+        return np.flatnonzero(sampled)
@@ -0,0 +1,57 @@
+import dash
+import pytest
+
+from dashboard_app import compression
+from dashboard_app.compression import choose_encoding, enable_compression
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("gzip, deflate", "gzip"),
+        ("GZIP", "gzip"),
+        ("gzip;q=0", None),
+        ("gzip;q=0.0", None),
+        ("gzip; q=0.000", None),
+        ("gzip;q=invalid", None),
+        ("deflate", None),
+        ("", None),
+    ],
+)
+def test_choose_encoding(monkeypatch, accept_encoding, expected):
+    monkeypatch.setattr(compression, "brotli", None)
+    assert choose_encoding(accept_encoding) == expected
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("gzip, br", "br"),
+        ("br; q=0, gzip", "gzip"),
+        ("br;q=0.5, gzip;q=1", "gzip"),
+        ("br;q=0.5, gzip;q=0.5", "br"),
+    ],
+)
+def test_choose_encoding_with_brotli(monkeypatch, accept_encoding, expected):
+    monkeypatch.setattr(compression, "brotli", object())
+    assert choose_encoding(accept_encoding) == expected
+
+
+def test_asset_cache_headers(tmp_path):
+    (tmp_path / "styles.css").write_text("body { color: black; }\n" * 100)
+    app = dash.Dash(__name__, assets_folder=str(tmp_path))
+    app.layout = dash.html.Div()
+    enable_compression(app)
+    client = app.server.test_client()
+    headers = {"Accept-Encoding": "gzip"}
+
+    response = client.get("/assets/styles.css", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.cache_control.public
+    assert response.cache_control.max_age == compression.ASSET_MAX_AGE
+
+    response = client.get("/assets/missing.css", headers=headers)
+    assert response.status_code == 404
+    assert not response.cache_control.public
+    assert response.cache_control.max_age is None
@@ -0,0 +1,29 @@
+from dashboard_app.figure_cache import FigureCache
+from dashboard_app.figure_store import DiskFigureStore
+
+
+class Figure:
+    def __init__(self):
+        self.serialized = 0
+
+    def to_json(self):
+        self.serialized += 1
+        return "{}"
+
+
+def test_put_skips_serialization_when_both_caches_are_off(tmp_path):
+    disk_store = DiskFigureStore(path=str(tmp_path / "figures.sqlite"), max_bytes=0)
+    cache = FigureCache(max_entries=0, disk_store=disk_store)
+    figure = Figure()
+    cache.put("key", figure)
+    assert figure.serialized == 0
+    assert cache.get("key") is None
+
+
+def test_put_and_get(tmp_path):
+    disk_store = DiskFigureStore(path=str(tmp_path / "figures.sqlite"), max_bytes=0)
+    cache = FigureCache(max_entries=4, disk_store=disk_store)
+    figure = Figure()
+    cache.put("key", figure)
+    assert cache.get("key") is figure
+    assert cache.stats()["hits"] == 1
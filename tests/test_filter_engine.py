@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dashboard_app.data_loader import get_cell_ids
+from dashboard_app.filter_engine import FilterEngine, get_cell_offsets
+from dashboard_app.filter_index import FILTER_DIMENSIONS
+from dashboard_app.helpers.get_filter_state import get_filter_state
+from dashboard_app.helpers.get_prefix_range import get_prefix_range
+
+NAICS = ["33", "331", "3321", "332710", "332999", "333", "4", None]
+ARCS = ["2.1", "2.11", "2.2", "2.2511", "2.2514", "2.3", None]
+STATES = ["CA", "CO", "TX", None]
+
+
+def make_frame(seed=0, n_rows=2000):
+    rng = np.random.default_rng(seed)
+    fy = pd.array(rng.integers(1981, 2025, n_rows), dtype="Int16")
+    fy[rng.random(n_rows) < 0.02] = pd.NA
+    df = pd.DataFrame(
+        {
+            "naics_imputed": pd.Categorical(rng.choice(NAICS, n_rows)),
+            "fy": fy,
+            "impstatus": pd.Categorical(rng.choice(["I", "N", "P", "K"], n_rows)),
+            "arc2": pd.Categorical(rng.choice(ARCS, n_rows)),
+            "state": pd.Categorical(rng.choice(STATES, n_rows)),
+            "value": rng.random(n_rows),
+        }
+    )
+    df["cell_id"] = get_cell_ids(df, FILTER_DIMENSIONS)
+    first_rows = ~df["cell_id"].duplicated().to_numpy()
+    cells = df.loc[first_rows, FILTER_DIMENSIONS]
+    cells = cells.iloc[np.argsort(df["cell_id"].to_numpy()[first_rows])]
+    return df, cells.reset_index(drop=True)
+
+
+def pandas_mask(df, naics_imputed, fy_range, impstatus, arc2, state):
+    # the filter semantics of the callbacks before the inverted index
+    def values_mask(column, values):
+        if not values:
+            return pd.Series(True, index=df.index)
+        mask = pd.Series(False, index=df.index)
+        labels = df[column].astype(str).where(df[column].notna())
+        for value in values:
+            if str(value).endswith("*"):
+                mask |= labels.str.startswith(str(value)[:-1]).fillna(False)
+            else:
+                mask |= df[column].isin([value])
+        return mask
+
+    mask = values_mask("naics_imputed", naics_imputed)
+    if fy_range:
+        mask &= ((df["fy"] >= fy_range[0]) & (df["fy"] <= fy_range[1])).fillna(False)
+    mask &= values_mask("impstatus", impstatus)
+    mask &= values_mask("arc2", arc2)
+    mask &= values_mask("state", state)
+    return mask.to_numpy(dtype=bool)
+
+
+FILTERS = [
+    ([], None, [], [], []),
+    (["33*"], None, [], [], []),
+    (["33*", "332710"], None, [], [], []),
+    (["332710", "3321"], [1990, 2000], ["I", "N"], [], []),
+    (["332*", "4"], [1981, 2024], [], ["2.2*", "2.2511"], ["CA"]),
+    ([], [2005, 2005], [], ["2.1*"], ["CO", "TX"]),
+    ([], [1970, 1980], [], [], []),
+    (["5*"], None, [], [], []),
+    (["999999"], None, [], [], ["CA"]),
+    ([], None, ["K"], ["2.2514", "2.3"], []),
+]
+
+
+@pytest.mark.parametrize("sort_by_cell", [True, False])
+@pytest.mark.parametrize("filters", FILTERS)
+def test_select_matches_pandas_mask(filters, sort_by_cell):
+    df, cells = make_frame()
+    if sort_by_cell:
+        df = df.sort_values("cell_id", kind="stable").reset_index(drop=True)
+    engine = FilterEngine(cells, {"frame": df})
+
+    rows = engine.select("frame", df, *filters)
+    expected = np.flatnonzero(pandas_mask(df, *filters))
+    np.testing.assert_array_equal(rows, expected)
+
+
+
+def test_select_with_bundle_offsets():
+    df, cells = make_frame()
+    df = df.sort_values("cell_id", kind="stable").reset_index(drop=True)
+    # as read back from cell_offsets.arrow of the serving bundle
+    cell_offsets = pd.DataFrame({"frame": get_cell_offsets(df, len(cells))})
+    engine = FilterEngine(cells, {"frame": df}, cell_offsets)
+    assert engine.cell_offsets["frame"].dtype == np.int32
+
+    for filters in FILTERS:
+        rows = engine.select("frame", df, *filters)
+        expected = np.flatnonzero(pandas_mask(df, *filters))
+        np.testing.assert_array_equal(rows, expected)
+
+def test_empty_filters_select_all_rows():
+    df, cells = make_frame()
+    engine = FilterEngine(cells, {"frame": df})
+    rows = engine.select("frame", df, [], None, [], [], [])
+    np.testing.assert_array_equal(rows, np.arange(len(df)))
+
+
+def test_missing_values_never_match():
+    df, cells = make_frame()
+    engine = FilterEngine(cells, {"frame": df})
+    rows = engine.select("frame", df, ["3*", "4"], [1900, 2100], [], ["2*"], [])
+    selected = df.iloc[rows]
+    assert len(selected) > 0
+    assert selected[["naics_imputed", "fy", "arc2"]].notna().all().all()
+
+
+def test_filter_state_normalization():
+    assert get_filter_state(
+        ["33*", "332710", "33*"], [1990, 2000], ["N", "I"], [], None
+    ) == get_filter_state(["33*"], (1990, 2000), ["I", "N"], None, [])
+    assert get_filter_state([], None, [], [], []) == (None,) * 5
+
+
+LABELS = np.array(["2.1", "2.11", "2.2", "3", "33", "332710", "339", "9"])
+
+
+@pytest.mark.parametrize(
+    "prefix, expected",
+    [
+        ("", (0, 8)),
+        ("1", (0, 0)),
+        ("2.1", (0, 2)),
+        ("2", (0, 3)),
+        ("33", (4, 7)),
+        ("3399", (7, 7)),
+        ("9", (7, 8)),
+        ("99", (8, 8)),
+    ],
+)
+def test_prefix_range_edges(prefix, expected):
+    assert get_prefix_range(LABELS, prefix) == expected
+    start, stop = expected
+    assert all(label.startswith(prefix) for label in LABELS[start:stop])
+    assert not any(
+        label.startswith(prefix)
+        for label in np.concatenate([LABELS[:start], LABELS[stop:]])
+    )
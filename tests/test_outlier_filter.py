@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dashboard_app.outlier_filter import OutlierFilter
+
+
+def make_frame():
+    return pd.DataFrame(
+        {
+            "arc2": ["2.1"] * 6 + ["2.2"],
+            "impstatus": ["I"] * 7,
+            "value": [1.0, 2.0, 3.0, 4.0, 5.0, 100.0, 7.0],
+        }
+    )
+
+
+@pytest.mark.parametrize("method", ["sigma", "iqr", "mad"])
+def test_single_row_group_is_kept(method):
+    df = make_frame()
+    outlier_filter = OutlierFilter(method=method, group_columns=["arc2"])
+    rows = outlier_filter.filter_rows(
+        "key", df, "value", 1.0, lambda: np.arange(len(df))
+    )
+    # the 2.2 group holds a single row: it has no spread and is not an outlier
+    assert 6 in rows
+    assert 5 not in rows
+
+
+def test_single_row_selection_is_kept():
+    df = make_frame()
+    outlier_filter = OutlierFilter(method="sigma", group_columns=[])
+    rows = outlier_filter.filter_rows("key", df, "value", 2.0, lambda: np.array([6]))
+    assert rows.tolist() == [6]
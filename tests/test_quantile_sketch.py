@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from dashboard_app.helpers.get_box_statistics import get_box_statistics
+from dashboard_app.quantile_sketch import CellSketches, get_cell_boxes
+
+
+def make_frame(seed=0, n_cells=40, rows_per_cell=60):
+    rng = np.random.default_rng(seed)
+    cells = pd.DataFrame(
+        {
+            "impstatus": rng.choice(["I", "N"], n_cells),
+            "arc2": rng.choice(["2.1", "2.2", "2.3"], n_cells),
+        }
+    )
+    cell_ids = np.repeat(np.arange(n_cells), rng.integers(1, rows_per_cell, n_cells))
+    frame = pd.DataFrame(
+        {
+            "cell_id": cell_ids.astype(np.int32),
+            "value": rng.lognormal(8, 1.5, len(cell_ids)).astype(np.float32),
+        }
+    )
+    frame["impstatus"] = cells["impstatus"].to_numpy()[cell_ids]
+    frame["arc2"] = cells["arc2"].to_numpy()[cell_ids]
+    return cells, frame
+
+
+def test_sketch_quartiles_match_exact_statistics():
+    relative_error = 0.01
+    cells, frame = make_frame()
+    cell_boxes, box_keys = get_cell_boxes(cells)
+    sketches = CellSketches(frame, "value", cell_boxes, box_keys, relative_error)
+
+    cell_mask = np.arange(len(cells)) % 3 != 0
+    sketched = sketches.box_statistics(cell_mask)
+    exact = get_box_statistics(
+        frame[cell_mask[frame["cell_id"]]], "value", ["impstatus", "arc2"]
+    )
+
+    merged = sketched.merge(exact, on=["impstatus", "arc2"], suffixes=("", "_exact"))
+    assert len(merged) == len(exact) > 0
+    assert (merged["count"] == merged["count_exact"]).all()
+    for column in ["q1", "median", "q3"]:
+        error = np.abs(merged[column] / merged[f"{column}_exact"] - 1)
+        assert error.max() <= relative_error * 1.001, column
+
+
+def test_single_value_boxes():
+    cells = pd.DataFrame({"impstatus": ["I"], "arc2": ["2.1"]})
+    frame = pd.DataFrame(
+        {"cell_id": np.zeros(1, dtype=np.int32), "value": np.float32([250.0])}
+    )
+    cell_boxes, box_keys = get_cell_boxes(cells)
+    sketches = CellSketches(frame, "value", cell_boxes, box_keys, 0.01)
+
+    statistics = sketches.box_statistics(np.ones(1, dtype=bool))
+    assert statistics["count"].tolist() == [1]
+    assert np.isclose(statistics["median"].iloc[0], 250.0, rtol=0.01)
@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+
+from dashboard_app.charts.webgl_points import create_webgl_points_chart
+
+LABELS = {"arc2": "Recommendation Type", "value": "Value", "impstatus": "Status"}
+CATEGORY_ORDERS = {"impstatus": ["I", "N", "P", "K"]}
+
+
+def test_points_and_boxes_per_group():
+    df = pd.DataFrame(
+        {
+            "arc2": ["2.1", "2.1", "2.2", "2.2"],
+            "impstatus": ["I", "N", "I", "N"],
+            "value": [1.0, 2.0, 3.0, 4.0],
+        }
+    )
+    fig = create_webgl_points_chart(
+        df, "arc2", "value", "impstatus", LABELS, CATEGORY_ORDERS
+    )
+    assert [trace.type for trace in fig.data] == ["box", "scattergl"] * 2
+    assert [trace.name for trace in fig.data[::2]] == ["I", "N"]
+
+
+def test_all_values_missing():
+    df = pd.DataFrame(
+        {"arc2": ["2.1", "2.2"], "impstatus": ["I", "N"], "value": [np.nan, np.nan]}
+    )
+    fig = create_webgl_points_chart(
+        df, "arc2", "value", "impstatus", LABELS, CATEGORY_ORDERS
+    )
+    assert len(fig.data) == 0
@@ -7,6 +7,10 @@ from janitor import clean_names
 import os
 import sys
 
+# make the dashboard package importable to build its serving bundle
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from dashboard_app.data_loader import build_serving_bundle
+
 # ------- define paths and file names -------
 
 # define relative path
@@ -311,4 +315,14 @@ integrated_df["naics_description"] = integrated_df["naics_description"].fillna(
 # ------------------------ Save data to CSV ------------------------#
 
 # Save the cleaned data to a CSV file
-integrated_df.to_csv("../../data/final/iac_integrated.csv", index=False)
+# (written under a temporary name first so a running dashboard never reads a partial file)
+output_path = Path("../../data/final/iac_integrated.csv")
+tmp_output_path = output_path.with_name(".iac_integrated.csv.tmp")
+integrated_df.to_csv(tmp_output_path, index=False)
+os.replace(tmp_output_path, output_path)
+
+# ------------------------ Save serving bundle ------------------------#
+
+# Pre-compute the de-duplicated per-chart frames and the filter options the
+# dashboard loads at startup (written to data/final/iac_serving/)
+build_serving_bundle()